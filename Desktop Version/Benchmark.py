@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Offline throughput benchmark, e.g.
+#   python Benchmark.py --docs 200 --latency 0.8 --rate-429 0.05 --pipelines recruiter,candidate
+# Synthetic resumes/JDs are generated on the fly and every Gemini call goes to FakeModel, so no quota is used.
+# Each run appends one line per pipeline to the results file and is compared with the last run of the same setup.
+
+# Everything the pipelines cache (~/.fresalyzer) goes to a throwaway home, so a run never reuses earlier answers
+# or touches the real quota ledger. Set before any project import; worker processes inherit it.
+# Results still go to the real ~/.fresalyzer, so they outlive the throwaway home and stay out of the repo.
+DEFAULT_OUTPUT = os.path.join(os.path.expanduser("~"), ".fresalyzer", "benchmark_results.jsonl")
+# Only a home made here is deleted afterwards; an existing FRESALYZER_BENCH_HOME is left alone.
+CREATED_BENCH_HOME = not os.environ.get("FRESALYZER_BENCH_HOME")
+BENCH_HOME = os.environ.get("FRESALYZER_BENCH_HOME") or tempfile.mkdtemp(prefix="fresalyzer_bench_")
+os.environ["FRESALYZER_BENCH_HOME"] = BENCH_HOME
+os.environ["HOME"] = os.environ["USERPROFILE"] = BENCH_HOME
+
+import fitz  # PyMuPDF
+import docx
+from google.api_core.exceptions import ResourceExhausted
+import Gemini_Client
+from Metrics import metrics, percentile
+from Model_Router import reset_health
+from Text_Extractor import extract_text_from_file, extract_texts_parallel, text_cache
+from Text_Normalizer import normalize_text
+from Scoring_Engine import TokenBucket, score_resumes, score_resumes_batched
+from Shortlist import Shortlist
+from Model_Comparison import analyze_resume_with_all_models
+
+PIPELINES = ("recruiter", "candidate", "quick", "analyzer")
+
+SKILLS = ["python", "java", "sql", "aws", "docker", "kubernetes", "react", "node.js", "tensorflow", "pytorch",
+          "spark", "kafka", "git", "linux", "azure", "gcp", "django", "flask", "pandas", "tableau"]
+WORDS = ["developed", "designed", "led", "built", "improved", "scalable", "pipeline", "service", "team",
+         "customer", "latency", "platform", "data", "model", "deployed", "automated", "reduced", "cost"]
+WORDS_PER_PAGE = 450
+
+def make_text(rng, kind, index, pages):
+    lines = [f"{kind.title()} {index}", f"Skills: {', '.join(rng.sample(SKILLS, 6))}"]
+    words = [rng.choice(WORDS + SKILLS) for _ in range(WORDS_PER_PAGE * pages)]
+    lines += [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    return "\n".join(lines)
+
+def write_document(path, text, pages):
+    ext = os.path.splitext(path)[1]
+    if ext == ".pdf":
+        doc = fitz.open()
+        lines = text.splitlines()
+        per_page = max(1, len(lines) // pages + 1)
+        for start in range(0, len(lines), per_page):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 555, 800), "\n".join(lines[start:start + per_page]), fontsize=9)
+        doc.save(path)
+        doc.close()
+    elif ext == ".docx":
+        document = docx.Document()
+        for line in text.splitlines():
+            document.add_paragraph(line)
+        document.save(path)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+def make_corpus(folder, resumes, jds, pages, formats, seed):
+    # Every document is unique, so nothing is served from the extraction or response caches.
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    resume_paths, jd_paths = [], []
+    for kind, count, paths, size in (("resume", resumes, resume_paths, pages), ("job", jds, jd_paths, 1)):
+        for i in range(count):
+            path = os.path.join(folder, f"{kind}_{i:04d}.{formats[i % len(formats)]}")
+            write_document(path, make_text(rng, kind, i, size), size)
+            paths.append(path)
+    return resume_paths, jd_paths
+
+class FakeUsage:
+    def __init__(self, prompt, text):
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+class FakeResponse:
+    def __init__(self, prompt, text):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt, text)
+
+class FakeStream:
+    def __init__(self, prompt, text, chunk_chars=200):
+        self.chunks = [FakeResponse(prompt, text[i:i + chunk_chars]) for i in range(0, len(text), chunk_chars)]
+        self.usage_metadata = FakeUsage(prompt, text)
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+class FakeModel:
+    # Stands in for genai.GenerativeModel: answers every prompt the pipelines send in the shape they expect,
+    # after a configurable latency, and fails a configurable share of requests with a 429.
+    def __init__(self, model_name, settings, rng, lock):
+        self.model_name = model_name
+        self.settings = settings
+        self.rng = rng
+        self.lock = lock
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        s = self.settings
+        with self.lock:
+            delay = max(0.0, self.rng.uniform(s.latency * (1 - s.jitter), s.latency * (1 + s.jitter)))
+            throttled = self.rng.random() < s.rate_429
+            score = self.rng.randint(20, 95)
+        time.sleep(delay)
+        if throttled:
+            raise ResourceExhausted(f"429 Resource has been exhausted (fake). retry_delay {{ seconds: {s.retry_delay} }}")
+        text = self.answer(prompt, score)
+        return FakeStream(prompt, text) if stream else FakeResponse(prompt, text)
+
+    def answer(self, prompt, score):
+        filler = "x" * self.settings.output_chars
+        if '"resume_id"' in prompt:
+            return json.dumps([{"resume_id": resume_id, "candidate_name": f"Candidate {resume_id}",
+                                "match_percentage": score, "notes": filler}
+                               for resume_id in re.findall(r"### Resume (R\d+)", prompt)])
+        if "required_skills" in prompt:
+            return json.dumps({"role": "Engineer", "required_skills": SKILLS[:5], "notes": filler})
+        if '"candidate_name"' in prompt:
+            name = re.search(r"Resume (\d+)", prompt)
+            return json.dumps({"candidate_name": f"Resume {name.group(1) if name else '?'}",
+                               "match_percentage": score, "notes": filler})
+        if '"match_percentage"' in prompt:
+            return json.dumps({"match_percentage": score, "notes": filler})
+        return (f"**Match Percentage**: {score}%\n**Missing Skills**: kafka, spark\n"
+                f"**Suggested Resume Template**: Fake Template\n**Generated Resume Code**:\n{filler}")
+
+def install_fake_backend(settings):
+    # Gemini_Client looks get_model up at call time, so every caller (router, ledger, cache) stays real.
+    # One seeded random stream for all fake models keeps runs repeatable.
+    rng, lock = random.Random(settings.seed), threading.Lock()
+    Gemini_Client.get_model = lambda api_key, model_name, generation_config=None: FakeModel(model_name, settings, rng, lock)
+    # The ledger still runs, but with limits that never make the benchmark wait.
+    Gemini_Client.quota_ledger.limits = [("", (10 ** 9, 10 ** 12, 10 ** 9))]
+
+def run_recruiter(args, resume_paths, jd_paths, api_key):
+    texts, _ = extract_texts_parallel(resume_paths)
+    job_text = normalize_text(extract_text_from_file(jd_paths[0]), args.max_tokens)
+    resume_texts = {path: normalize_text(text, args.max_tokens) for path, text in zip(resume_paths, texts) if text}
+    paths = list(resume_texts)
+    shortlist = Shortlist(args.top_n)
+    limiter = TokenBucket(rpm=10 ** 9, tpm=10 ** 12)
+    if args.batch_budget > 0:
+        score_resumes_batched(paths, job_text, api_key, args.model, resume_texts.get, token_budget=args.batch_budget,
+                              max_workers=args.workers, limiter=limiter, on_result=shortlist.add)
+    else:
+        score_resumes(paths, job_text, api_key, args.model, resume_texts.get, max_workers=args.workers,
+                      limiter=limiter, on_result=shortlist.add)
+    return len(paths)
+
+def stream_report(prompt, api_key, model):
+    return "".join(Gemini_Client.stream_text(prompt, api_key, model))
+
+def run_candidate(args, resume_paths, jd_paths, api_key):
+    # Candidate Mode: one resume against every JD, each answer streamed like the result windows do.
+    from Candidate_Mode import build_analysis_prompt
+    resume_text = normalize_text(extract_text_from_file(resume_paths[0]), args.max_tokens)
+    texts, _ = extract_texts_parallel(jd_paths)
+    for text in filter(None, texts):
+        stream_report(build_analysis_prompt(resume_text, normalize_text(text, args.max_tokens), "LaTeX", 1),
+                      api_key, args.model)
+    return len(jd_paths)
+
+def run_quick(args, resume_paths, jd_paths, api_key):
+    # Quick Check: one streamed report per resume, each against the first JD.
+    from Quick_Check import build_analysis_prompt
+    job_text = normalize_text(extract_text_from_file(jd_paths[0]), args.max_tokens)
+    for path in resume_paths[:args.quick_docs]:
+        resume_text = normalize_text(extract_text_from_file(path), args.max_tokens)
+        stream_report(build_analysis_prompt(resume_text, job_text, "LaTeX", 1), api_key, args.model)
+    return min(len(resume_paths), args.quick_docs)
+
+def run_analyzer(args, resume_paths, jd_paths, api_key):
+    # Model Analyzer: the first resume/JD pair against every model in Model_Comparison.
+    resume_text = normalize_text(extract_text_from_file(resume_paths[0]), args.max_tokens)
+    job_text = normalize_text(extract_text_from_file(jd_paths[0]), args.max_tokens)
+    analyze_resume_with_all_models(resume_text, job_text, api_key)
+    return 1
+
+RUNNERS = {"recruiter": run_recruiter, "candidate": run_candidate, "quick": run_quick, "analyzer": run_analyzer}
+
+def peak_rss_mb():
+    # Peak resident memory of this process and of its (finished) worker processes, where the platform reports it.
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+def histogram_total(snapshot, name):
+    return sum(h["sum"] for h in snapshot["histograms"] if h["name"] == name)
+
+def counter_total(snapshot, name, **labels):
+    return sum(c["value"] for c in snapshot["counters"] if c["name"] == name
+               and all(c["labels"].get(k) == v for k, v in labels.items()))
+
+def latency_samples():
+    # Every llm_latency_seconds / first-token sample currently held, over all models.
+    return metrics.all_samples("llm_latency_seconds")
+
+def run_pipeline(name, args, resume_paths, jd_paths):
+    # Each pipeline starts cold: no cached extractions or answers from the one before it.
+    text_cache.clear()
+    Gemini_Client.response_cache.clear()
+    metrics.reset()
+    reset_health()
+    api_key = ",".join(f"fake-key-{i}" for i in range(args.keys))
+    start = time.perf_counter()
+    docs = RUNNERS[name](args, resume_paths, jd_paths, api_key)
+    wall = time.perf_counter() - start
+    snapshot = metrics.snapshot()
+    samples = latency_samples()
+    waits = sum(histogram_total(snapshot, n) for n in
+                ("quota_wait_seconds", "rate_limit_wait_seconds", "router_wait_seconds"))
+    return {
+        "pipeline": name,
+        "docs": docs,
+        "wall_seconds": round(wall, 3),
+        "docs_per_sec": round(docs / wall, 3) if wall else None,
+        "llm_p50": round(percentile(samples, 0.5), 4) if samples else None,
+        "llm_p95": round(percentile(samples, 0.95), 4) if samples else None,
+        "extract_seconds": round(histogram_total(snapshot, "extract_seconds"), 3),
+        "llm_seconds": round(histogram_total(snapshot, "llm_latency_seconds"), 3),
+        "wait_seconds": round(waits, 3),
+        "requests": counter_total(snapshot, "llm_requests_total"),
+        "throttled": counter_total(snapshot, "llm_requests_total", outcome="ResourceExhausted"),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def setup_of(args):
+    # The knobs that must match for two runs to be comparable.
+    keys = ("docs", "jds", "pages", "formats", "latency", "jitter", "rate_429", "retry_delay", "output_chars",
+            "keys", "workers", "batch_budget", "max_tokens", "top_n", "quick_docs", "model", "seed")
+    return {key: getattr(args, key) for key in keys}
+
+def previous_runs(path, setup):
+    runs = {}
+    if not os.path.exists(path):
+        return runs
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("setup") == setup:
+                runs[entry["result"]["pipeline"]] = entry
+    return runs
+
+def print_result(result, previous):
+    line = (f"{result['pipeline']:<10} {result['docs']:>5} docs  {result['wall_seconds']:>8.2f}s  "
+            f"{result['docs_per_sec']:>8.2f} docs/s  p50 {result['llm_p50']}s  p95 {result['llm_p95']}s  "
+            f"extract {result['extract_seconds']}s  llm {result['llm_seconds']}s  wait {result['wait_seconds']}s  "
+            f"429s {result['throttled']}/{result['requests']}  peak RSS {result['peak_rss_mb']} MB")
+    if previous and previous["result"].get("docs_per_sec"):
+        change = (result["docs_per_sec"] / previous["result"]["docs_per_sec"] - 1) * 100
+        line += f"  ({change:+.1f}% docs/s vs {previous.get('revision') or 'previous run'})"
+    print(line)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fresalyzer-bench", description="Offline FrResAlyzer benchmark.")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="comma-separated: " + ", ".join(PIPELINES))
+    parser.add_argument("--docs", type=int, default=100, help="synthetic resumes")
+    parser.add_argument("--jds", type=int, default=5, help="synthetic job descriptions")
+    parser.add_argument("--pages", type=int, default=2, help="pages per resume")
+    parser.add_argument("--formats", default="pdf,docx,txt")
+    parser.add_argument("--latency", type=float, default=0.5, help="mean fake model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.3, help="latency spread as a fraction of the mean")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-delay", type=int, default=1, help="retry delay the fake 429s ask for")
+    parser.add_argument("--output-chars", type=int, default=200, help="extra characters in every answer")
+    parser.add_argument("--keys", type=int, default=1, help="fake API keys to route over")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-budget", type=int, default=0, help="recruiter multi-resume token budget (0 = off)")
+    parser.add_argument("--max-tokens", type=int, default=6000, help="token budget per document")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--quick-docs", type=int, default=5, help="resumes the quick pipeline analyzes")
+    parser.add_argument("--model", default="gemini-2.0-flash")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="results file (JSON lines, appended)")
+    parser.add_argument("--keep-corpus", action="store_true", help=f"leave the corpus in {BENCH_HOME}")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pipelines = [name.strip() for name in args.pipelines.split(",") if name.strip()]
+    unknown = [name for name in pipelines if name not in RUNNERS]
+    if unknown:
+        sys.exit(f"Unknown pipeline(s): {', '.join(unknown)}")
+
+    install_fake_backend(args)
+    formats = [fmt.strip().lstrip(".") for fmt in args.formats.split(",")]
+    try:
+        print(f"Generating {args.docs} resume(s) and {args.jds} JD(s) in {BENCH_HOME}...", file=sys.stderr)
+        resume_paths, jd_paths = make_corpus(os.path.join(BENCH_HOME, "corpus"), args.docs, args.jds,
+                                             args.pages, formats, args.seed)
+        setup = setup_of(args)
+        previous = previous_runs(args.output, setup)
+        revision = git_revision()
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as out:
+            for name in pipelines:
+                result = run_pipeline(name, args, resume_paths, jd_paths)
+                print_result(result, previous.get(name))
+                out.write(json.dumps({"time": time.time(), "revision": revision, "setup": setup, "result": result}) + "\n")
+                out.flush()
+    finally:
+        if CREATED_BENCH_HOME and not args.keep_corpus:
+            shutil.rmtree(BENCH_HOME, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,19 @@
 import tkinter as tk
-from tkinter import filedialog, ttk, messagebox, scrolledtext
-import fitz  # PyMuPDF
-import docx
+from tkinter import filedialog, ttk, messagebox
 import os
-import pyperclip
-import google.generativeai as genai
+import queue
+import threading
 import matplotlib.pyplot as plt
-from PIL import Image, ImageTk
-
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = "\n".join([page.get_text() for page in doc])
-    return text
-
-def extract_text_from_docx(docx_path):
-    doc = docx.Document(docx_path)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
-
-def extract_text_from_file(file_path):
-    if not os.path.exists(file_path):
-        return f"Error: File not found at '{file_path}'. Please check the path."
-
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower()
-
-    try:
-        if ext == ".pdf":
-            return extract_text_from_pdf(file_path)
-        elif ext == ".docx":
-            return extract_text_from_docx(file_path)
-        elif ext == ".txt":
-            with open(file_path, encoding="utf-8") as f:
-                return f.read()
-        else:
-            return f"Error: Unsupported file format '{ext}'. Please use PDF/DOCX/TXT format only"
-    except UnicodeDecodeError:
-        return "Error: Unable to decode the text. Please ensure the file is encoded in UTF-8."
-    except Exception as e:
-        return f"An unexpected error occurred while reading the file: {str(e)}"
-
-def extract_texts_from_files(file_paths):
-    return [(os.path.basename(path), extract_text_from_file(path)) for path in file_paths]
-
-def analyze_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, job_name, model_name):
-    genai.configure(api_key=api_key)
-
-    prompt = f"""
+from Gemini_Client import stream_text
+from Text_Extractor import extract_text_from_file, extract_texts_parallel, format_page_report
+from Text_Normalizer import normalize_text, format_report
+from Response_Parser import find_percentage
+from Stats_Panel import show_stats_panel
+from Stream_Window import show_stream_result
+from Model_Analyzer import show_efficiency_window
+
+def build_analysis_prompt(resume_text, job_desc_text, code_type, pages):
+    return f"""
     Analyze the provided resume and job description thoroughly. Perform the following tasks:  
 
     **Match Analysis:**  
@@ -83,45 +50,13 @@ def analyze_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type
     **Generated Resume Code**: (Fully formatted and ready to use)
     """
 
-    model = genai.GenerativeModel(model_name)
-    response = model.generate_content(prompt)
-    return response.text
+def stream_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, job_name, model_name):
+    prompt = build_analysis_prompt(resume_text, job_desc_text, code_type, pages)
+    return stream_text(prompt, api_key, model_name)
 
-def display_result(job_name, text, model_used):
-    result_window = tk.Toplevel(root)
-    result_window.title(f"Analysis Result - {job_name}")
-    result_window.geometry("800x600")
-
-    model_note = tk.Label(result_window, text=f"Result generated using Gemini Model: {model_used}", fg="blue", font=("Arial", 10, "italic"))
-    model_note.pack(pady=(5, 0))
-
-    text_box = scrolledtext.ScrolledText(result_window, wrap=tk.WORD, font=("Arial", 10))
-    text_box.insert(tk.END, text)
-    text_box.pack(expand=True, fill="both")
-
-    def show_code():
-        code_window = tk.Toplevel(result_window)
-        code_window.title("Generated Resume Code")
-        code_window.geometry("800x600")
-        code_box = scrolledtext.ScrolledText(code_window, wrap=tk.WORD, font=("Courier", 10))
-
-        start = text.lower().find("generated resume code")
-        if start != -1:
-            code = text[start:].split("\n", 1)[-1].strip()
-        else:
-            code = "No code found"
-        code_box.insert(tk.END, code)
-        code_box.pack(expand=True, fill="both")
-
-        def copy_code():
-            pyperclip.copy(code)
-            messagebox.showinfo("Copied", "Code copied to clipboard!")
-
-        copy_btn = tk.Button(code_window, text="Copy Code", command=copy_code)
-        copy_btn.pack(pady=5)
-
-    show_code_btn = tk.Button(result_window, text="Show Resume Code", command=show_code)
-    show_code_btn.pack(pady=5)
+def display_result(job_name, chunks, model_used, on_done=None):
+    show_stream_result(root, f"Analysis Result - {job_name}", f"Result generated using Gemini Model: {model_used}",
+                       chunks, "candidate", on_done, error_prefix=f"Error analyzing {job_name}: ")
 
 def show_comparison_chart(match_results):
     import matplotlib.pyplot as plt
@@ -143,23 +78,6 @@ def show_comparison_chart(match_results):
     plt.tight_layout()
     plt.show()
 
-def show_efficiency_chart():
-    try:
-        image_path = "C:/Users/user/Desktop/FYP Backup/RP/Figure_1.png"  # Change to your image path
-        img = Image.open(image_path)
-        img = img.resize((600, 400), Image.Resampling.LANCZOS)
-
-        img_window = tk.Toplevel(root)
-        img_window.title("Model Efficiency Chart")
-
-        tk_img = ImageTk.PhotoImage(img)
-        label = tk.Label(img_window, image=tk_img)
-        label.image = tk_img
-        label.pack()
-
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load image: {str(e)}")
-
 def main():
     def upload_resume():
         path = filedialog.askopenfilename(filetypes=[("Supported Files", "*.pdf *.docx *.txt")])
@@ -183,31 +101,70 @@ def main():
             messagebox.showerror("Input Error", "Please fill in all fields.")
             return
 
-        resume_text = extract_text_from_file(resume_path)
-        job_desc_texts = extract_texts_from_files(job_desc_paths)
+        # Extraction runs on a worker thread; the Tk side picks up its result with after().
+        extracted = queue.Queue()
 
-        best_match = {"percentage": 0, "job": None}
-        match_results = []
-
-        for job_file, jd_text in job_desc_texts:
+        def extract():
             try:
-                result = analyze_resume_with_google_ai(resume_text, jd_text, api_key, code_type, pages, job_file, selected_model)
-                display_result(job_file, result, selected_model)
-
-                match_line = next((line for line in result.splitlines() if "match percentage" in line.lower()), None)
-                if match_line:
-                    perc = int(''.join(filter(str.isdigit, match_line)))
-                    match_results.append((job_file, perc))
-                    if perc > best_match["percentage"]:
-                        best_match = {"percentage": perc, "job": job_file}
+                report = {}
+                page_reports = {resume_path: {}}
+                resume_text = normalize_text(extract_text_from_file(resume_path, page_reports[resume_path]), report=report)
+                texts, failures = extract_texts_parallel(job_desc_paths, reports=page_reports)
+                for note in filter(None, (format_page_report(os.path.basename(path), r) for path, r in page_reports.items())):
+                    print(note)
+                job_desc_texts = [(os.path.basename(path), normalize_text(text, report=report))
+                                  for path, text in zip(job_desc_paths, texts) if text is not None]
+                print(format_report(report))
+                extracted.put((resume_text, job_desc_texts, failures))
             except Exception as e:
-                messagebox.showerror("Error", f"Error analyzing {job_file}: {str(e)}")
-
-        if best_match["job"]:
-            messagebox.showinfo("Best Match Result", f"Most Suitable Job: {best_match['job']}\nMatch: {best_match['percentage']}%")
+                extracted.put(e)
 
-        if match_results:
-            show_comparison_chart(match_results)
+        def wait_for_texts():
+            try:
+                result = extracted.get_nowait()
+            except queue.Empty:
+                root.after(100, wait_for_texts)
+                return
+            if isinstance(result, Exception):
+                messagebox.showerror("Error", f"Could not read the documents: {result}")
+                return
+            start_analysis(*result)
+
+        def start_analysis(resume_text, job_desc_texts, failures):
+            if failures:
+                failed = "\n".join(f"{os.path.basename(path)}: {err}" for path, err in failures)
+                messagebox.showwarning("Some Job Descriptions Failed", f"{len(failures)} job description(s) could not be read:\n{failed}")
+
+            best_match = {"percentage": 0, "job": None}
+            match_results = []
+
+            # Job descriptions are streamed one after another; each window starts the next when it finishes.
+            def analyze_next(index):
+                if index == len(job_desc_texts):
+                    if best_match["job"]:
+                        messagebox.showinfo("Best Match Result", f"Most Suitable Job: {best_match['job']}\nMatch: {best_match['percentage']}%")
+                    if match_results:
+                        show_comparison_chart(match_results)
+                    return
+
+                job_file, jd_text = job_desc_texts[index]
+
+                def on_done(result):
+                    match_line = next((line for line in result.splitlines() if "match percentage" in line.lower()), None)
+                    perc = find_percentage(match_line) if match_line else None
+                    if perc is not None:
+                        match_results.append((job_file, perc))
+                        if perc > best_match["percentage"]:
+                            best_match.update({"percentage": perc, "job": job_file})
+                    analyze_next(index + 1)
+
+                chunks = stream_resume_with_google_ai(resume_text, jd_text, api_key, code_type, pages, job_file, selected_model)
+                display_result(job_file, chunks, selected_model, on_done)
+
+            analyze_next(0)
+
+        threading.Thread(target=extract, daemon=True).start()
+        root.after(100, wait_for_texts)
 
     global root
     job_desc_paths = []
@@ -216,7 +173,7 @@ def main():
     root.title("FrResAlyzer - Candidate Mode")
     root.geometry("600x600")
 
-    tk.Label(root, text="Google API Key:").pack()
+    tk.Label(root, text="Google API Key(s), comma-separated:").pack()
     api_entry = tk.Entry(root, width=60, show='*')
     api_entry.pack()
 
@@ -238,7 +195,7 @@ def main():
     pages_var = ttk.Combobox(root, values=["one", "multi"])
     pages_var.pack()
 
-    tk.Label(root, text="Note: If you get error 429 / invalid API / expired key, please try a different model.",
+    tk.Label(root, text="Note: Rate-limited (429) or invalid keys are skipped when several are given. If every key fails, please try a different model.",
              fg="red", font=("Arial", 9, "bold")).pack(pady=(10, 2))
 
     model_frame = tk.Frame(root)
@@ -254,9 +211,12 @@ def main():
     model_var = ttk.Combobox(model_frame, values=model_names, width=45)
     model_var.pack(side="left", padx=5)
 
-    tk.Button(model_frame, text="Show Model's Efficiencies", command=show_efficiency_chart).pack(side="left")
+    tk.Button(model_frame, text="Show Model's Efficiencies", command=lambda: show_efficiency_window(root)).pack(side="left")
 
-    tk.Button(root, text="Analyze", command=analyze, bg="green", fg="white").pack(pady=10)
+    action_frame = tk.Frame(root)
+    action_frame.pack(pady=10)
+    tk.Button(action_frame, text="Analyze", command=analyze, bg="green", fg="white").pack(side="left", padx=5)
+    tk.Button(action_frame, text="Show Stats", command=lambda: show_stats_panel(root, "candidate")).pack(side="left", padx=5)
 
     root.mainloop()
 
@@ -0,0 +1,354 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from Text_Extractor import SUPPORTED_EXTENSIONS, extract_text_from_file, extract_texts_parallel, format_page_report
+from Text_Normalizer import normalize_text, format_report, DEFAULT_TOKEN_BUDGET
+from Lexical_Ranker import bm25_scores, rank_top_k, to_percentages
+from Scoring_Engine import (TokenBucket, score_resumes, score_resumes_batched, score_resume, score_resumes_cascade,
+                            rate_limits, DEFAULT_WORKERS, HEDGE_PERCENTILE, CASCADE_BAND)
+from JD_Profile import get_jd_profile
+from Results_Store import ResultsStore, checkpoint
+from Shortlist import Shortlist
+from Model_Comparison import (models, analyze_resume_with_all_models, MODEL_DEADLINE, load_dataset, evaluate_models,
+                              save_evaluation, format_evaluation, EVALUATION_FILE, DEFAULT_TOLERANCE,
+                              DEFAULT_MIN_ACCURACY)
+from Metrics import metrics
+from Gemini_Client import quota_ledger
+from Model_Router import split_options
+from Quota_Ledger import key_hash
+
+# Headless entry point for large or scheduled runs, e.g.
+#   python FResAlyzer_CLI.py batch --jd jd.pdf --resumes ./resumes --top-n 50 --output results.jsonl
+# Deliberately free of tkinter, matplotlib and streamlit imports.
+
+DEFAULT_MODEL = "gemini-1.5-flash-latest"
+
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+class ResultWriter:
+    # One row per finished item, flushed straight away so an interrupted run keeps everything done so far.
+    def __init__(self, path, fields):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if path.lower().endswith(".csv"):
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, row):
+        if self._csv:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.start = time.monotonic()
+
+    def step(self):
+        self.done += 1
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        sys.stderr.write(f"\r[{self.done}/{self.total}] {rate:.2f} docs/s, ETA {eta:.0f}s ")
+        sys.stderr.flush()
+
+    def finish(self):
+        sys.stderr.write("\n")
+
+def print_shortlist(shortlist, label):
+    print(f"Top {shortlist.top_n} ({label}):")
+    for rank, (path, (name, percent, _, model)) in enumerate(shortlist.items(), 1):
+        print(f"{rank}. {name}: {percent}% ({os.path.basename(path)}{', ' + model if model else ''})")
+
+def run_batch(args):
+    resume_paths = collect_files(args.resumes)
+    report = {}
+    job_text = normalize_text(extract_text_from_file(args.jd), args.max_tokens, report)
+
+    # Every text is needed up front: for pre-ranking, batching and matching against saved results.
+    page_reports = {}
+    texts, extract_failures = extract_texts_parallel(resume_paths, reports=page_reports)
+    for note in filter(None, (format_page_report(path, r) for path, r in page_reports.items())):
+        print(note, file=sys.stderr)
+    resume_texts = {path: normalize_text(text, args.max_tokens, report)
+                    for path, text in zip(resume_paths, texts) if text is not None}
+    resume_paths = [path for path in resume_paths if path in resume_texts]
+
+    writer = ResultWriter(args.output, ["file", "candidate_name", "match_percentage", "model", "error"])
+    shortlist = Shortlist(args.top_n, rescorable=bool(args.cascade_model))
+    try:
+        for path, error in extract_failures:
+            writer.write({"file": path, "error": error})
+        if args.fast:
+            texts = [resume_texts[path] for path in resume_paths]
+            progress = Progress(len(resume_paths))
+            for path, percent in zip(resume_paths, to_percentages(bm25_scores(job_text, texts))):
+                name = os.path.basename(path)
+                writer.write({"file": path, "candidate_name": name, "match_percentage": percent, "model": "bm25"})
+                shortlist.add(path, (name, percent, "", None))
+                progress.step()
+            progress.finish()
+            label = "local BM25 fast mode"
+        else:
+            paths = resume_paths
+            if args.prerank_factor > 0:
+                top_indices, _ = rank_top_k(job_text, [resume_texts[path] for path in paths], args.prerank_factor * args.top_n)
+                paths = [paths[i] for i in top_indices]
+
+            limiter = make_limiter(args, [args.model, args.hedge_model, args.cascade_model])
+            prompt_job_text = job_text if args.no_jd_profile else get_jd_profile(job_text, args.api_key, args.model, limiter)
+            store = ResultsStore()
+
+            def saved(model, model_paths):
+                completed, remaining, record = checkpoint(store, prompt_job_text, model, model_paths, resume_texts)
+                if args.fresh:
+                    return [], model_paths, record
+                if completed:
+                    print(f"Reusing {len(completed)} saved {model} score(s); {len(remaining)} resume(s) left to score",
+                          file=sys.stderr)
+                return completed, remaining, record
+
+            def write(path, result):
+                name, percent, _, model = result
+                writer.write({"file": path, "candidate_name": name, "match_percentage": percent, "model": model})
+
+            def emit(path, result):
+                write(path, result)
+                shortlist.add(path, result)
+
+            def on_failure(path, error):
+                writer.write({"file": path, "model": args.model, "error": error})
+                progress.step()
+
+            if args.cascade_model:
+                # Borderline resumes get a second row, from the strong model, which replaces their first score.
+                progress = Progress(len(paths))
+
+                def on_first(path, result):
+                    emit(path, result)
+                    progress.step()
+
+                def on_rescore(path, result):
+                    write(path, result)
+                    shortlist.replace(path, result)
+
+                score_resumes_cascade(paths, prompt_job_text, args.api_key, args.model, resume_texts.get, args.top_n,
+                                      args.cascade_model, args.cascade_band, token_budget=args.batch_budget,
+                                      max_workers=args.workers, limiter=limiter, on_result=on_first,
+                                      on_failure=on_failure, on_rescore=on_rescore, saved=saved,
+                                      hedge_model=args.hedge_model, hedge_percentile=args.hedge_percentile / 100,
+                                      shortlist=shortlist)
+                progress.finish()
+                label = f"cascade {args.cascade_model} -> Gemini model {args.model}"
+            else:
+                completed, remaining, record = saved(args.model, paths)
+                for path, result in completed:
+                    emit(path, result)
+                progress = Progress(len(remaining))
+
+                def on_result(path, result):
+                    record(path, result)
+                    emit(path, result)
+                    progress.step()
+
+                if args.batch_budget > 0:
+                    score_resumes_batched(remaining, prompt_job_text, args.api_key, args.model, resume_texts.get,
+                                          token_budget=args.batch_budget, max_workers=args.workers, limiter=limiter,
+                                          on_result=on_result, on_failure=on_failure, hedge_model=args.hedge_model,
+                                          hedge_percentile=args.hedge_percentile / 100)
+                else:
+                    score_resumes(remaining, prompt_job_text, args.api_key, args.model, resume_texts.get,
+                                  max_workers=args.workers, limiter=limiter, on_result=on_result, on_failure=on_failure,
+                                  hedge_model=args.hedge_model, hedge_percentile=args.hedge_percentile / 100)
+                progress.finish()
+                label = f"Gemini model {args.model}"
+    finally:
+        writer.close()
+
+    if report:
+        print(format_report(report), file=sys.stderr)
+    print_shortlist(shortlist, label)
+
+def run_candidate(args):
+    jd_paths = collect_files(args.jds)
+    resume_text = normalize_text(extract_text_from_file(args.resume), args.max_tokens)
+    limiter = make_limiter(args, [args.model, args.hedge_model])
+
+    def score_job(path):
+        jd_text = normalize_text(extract_text_from_file(path), args.max_tokens)
+        _, percent, _, model = score_resume(args.resume, jd_text, args.api_key, args.model, lambda _: resume_text,
+                                            limiter, hedge_model=args.hedge_model,
+                                            hedge_percentile=args.hedge_percentile / 100)
+        return percent, model
+
+    writer = ResultWriter(args.output, ["job_description", "match_percentage", "model", "error"])
+    progress = Progress(len(jd_paths))
+    shortlist = Shortlist(args.top_n)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {pool.submit(score_job, path): path for path in jd_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    percent, model = future.result()
+                    writer.write({"job_description": path, "match_percentage": percent, "model": model})
+                    shortlist.add(path, (os.path.basename(path), percent, "", model))
+                except Exception as e:
+                    writer.write({"job_description": path, "model": args.model, "error": str(e)})
+                progress.step()
+        progress.finish()
+    finally:
+        writer.close()
+
+    print_shortlist(shortlist, f"Gemini model {args.model}")
+
+def run_compare(args):
+    resume_text = normalize_text(extract_text_from_file(args.resume), args.max_tokens)
+    job_text = normalize_text(extract_text_from_file(args.jd), args.max_tokens)
+
+    writer = ResultWriter(args.output, ["model", "match_percentage", "error"])
+    progress = Progress(len(models))
+
+    def on_result(model_name, result):
+        writer.write({"model": model_name, "match_percentage": result["score"], "error": result["error"]})
+        progress.step()
+
+    try:
+        results = analyze_resume_with_all_models(resume_text, job_text, args.api_key, deadline=args.deadline,
+                                                 on_result=on_result)
+        progress.finish()
+    finally:
+        writer.close()
+
+    for model_name, result in results.items():
+        print(f"{model_name}: ERROR - {result['error']}" if result["error"] else f"{model_name}: {result['score']:.1f}%")
+
+def run_evaluate(args):
+    items = load_dataset(args.dataset)
+    model_names = [name.strip() for name in args.models.split(",")] if args.models else models
+    progress = Progress(len(items) * len(model_names))
+    evaluation = evaluate_models(items, args.api_key, model_names, args.tolerance, args.deadline,
+                                 on_progress=lambda done, total: progress.step())
+    progress.finish()
+    save_evaluation(evaluation, args.results)
+    print(format_evaluation(evaluation, args.min_accuracy))
+    print(f"Saved to {args.results}", file=sys.stderr)
+
+def make_limiter(args, model_names):
+    rpm, tpm = rate_limits(",".join(filter(None, model_names)), args.rpm, args.tpm)
+    for model_name in split_options(args.model):
+        print(f"Rate limits in force for {quota_ledger.describe(model_name)}", file=sys.stderr)
+    return TokenBucket(rpm=rpm, tpm=tpm)
+
+def run_quota(args):
+    # What the shared quota ledger has booked per key and model, across every FrResAlyzer process.
+    for model_name in split_options(args.model):
+        print(f"Limits for {quota_ledger.describe(model_name)}")
+    for api_key in split_options(args.api_key):
+        for model_name in split_options(args.model):
+            usage = quota_ledger.usage(api_key, model_name)
+            print(f"key {key_hash(api_key)[:8]} {model_name}: " +
+                  ", ".join(f"{name.replace('_', ' ')} {used}/{limit}" for name, (used, limit) in usage.items()))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fresalyzer", description="Headless FrResAlyzer runs.")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY"),
+                        help="Google API key(s), comma-separated (defaults to $GOOGLE_API_KEY)")
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_TOKEN_BUDGET, help="token budget per document")
+    parser.add_argument("--metrics", help="write per-stage timings, tokens and retries here at the end "
+                                          "(.prom for Prometheus text, otherwise JSON)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_rate_options(sub):
+        sub.add_argument("--model", default=DEFAULT_MODEL,
+                         help="model, or comma-separated models to fail over to in order")
+        sub.add_argument("--hedge-model", help="also send requests slower than --hedge-percentile to this model; "
+                                               "the first valid answer wins")
+        sub.add_argument("--hedge-percentile", type=float, default=HEDGE_PERCENTILE * 100,
+                         help="latency percentile of the model's recent requests after which to hedge")
+        sub.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+        sub.add_argument("--rpm", type=int, help="requests per minute (default: the model's limit in the quota ledger)")
+        sub.add_argument("--tpm", type=int, help="tokens per minute (default: the model's limit in the quota ledger)")
+        sub.add_argument("--top-n", type=int, default=10)
+        sub.add_argument("--output", required=True, help="results file (.jsonl or .csv)")
+
+    batch = subparsers.add_parser("batch", help="Recruiter Mode: rank many resumes against one JD")
+    batch.add_argument("--jd", required=True)
+    batch.add_argument("--resumes", nargs="+", required=True, help="resume files and/or directories")
+    add_rate_options(batch)
+    batch.add_argument("--prerank-factor", type=int, default=3, help="send only the top factor x N resumes to Gemini (0 = all)")
+    batch.add_argument("--batch-budget", type=int, default=0, help="token budget for multi-resume requests (0 = off)")
+    batch.add_argument("--no-jd-profile", action="store_true", help="send the full JD instead of the compact profile")
+    batch.add_argument("--fast", action="store_true", help="local BM25 ranking only, no API calls")
+    batch.add_argument("--fresh", action="store_true", help="rescore everything instead of reusing saved results")
+    batch.add_argument("--cascade-model", help="score every resume with this cheap model first (e.g. gemini-1.5-flash-8b); "
+                                               "--model only re-scores the ones near the top-N cutoff")
+    batch.add_argument("--cascade-band", type=float, default=CASCADE_BAND,
+                       help="points around the top-N cutoff that --model re-scores")
+    batch.set_defaults(func=run_batch)
+
+    candidate = subparsers.add_parser("candidate", help="Candidate Mode: score one resume against many JDs")
+    candidate.add_argument("--resume", required=True)
+    candidate.add_argument("--jds", nargs="+", required=True, help="job description files and/or directories")
+    add_rate_options(candidate)
+    candidate.set_defaults(func=run_candidate)
+
+    compare = subparsers.add_parser("compare", help="Model Analyzer: score one pair with every model")
+    compare.add_argument("--resume", required=True)
+    compare.add_argument("--jd", required=True)
+    compare.add_argument("--deadline", type=float, default=MODEL_DEADLINE, help="seconds per model")
+    compare.add_argument("--output", required=True, help="results file (.jsonl or .csv)")
+    compare.set_defaults(func=run_compare)
+
+    evaluate = subparsers.add_parser("evaluate", help="Model Analyzer: measure every model on a labelled dataset")
+    evaluate.add_argument("--dataset", required=True, help="CSV with resume, jd and label (expected match %%) columns")
+    evaluate.add_argument("--models", help="comma-separated models (default: all Model Analyzer models)")
+    evaluate.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                          help="points a score may differ from its label and still agree")
+    evaluate.add_argument("--min-accuracy", type=float, default=DEFAULT_MIN_ACCURACY,
+                          help="accuracy %% the recommended model must reach")
+    evaluate.add_argument("--deadline", type=float, default=MODEL_DEADLINE, help="seconds per request")
+    evaluate.add_argument("--results", default=EVALUATION_FILE, help="where the measurements are saved")
+    evaluate.set_defaults(func=run_evaluate)
+
+    quota = subparsers.add_parser("quota", help="show the requests and tokens booked against each key's limits")
+    quota.add_argument("--model", default=DEFAULT_MODEL, help="model, or comma-separated models")
+    quota.set_defaults(func=run_quota)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.api_key and not getattr(args, "fast", False):
+        parser.error("an API key is required (--api-key or $GOOGLE_API_KEY)")
+    for option in ("rpm", "tpm"):
+        if getattr(args, option, None) is not None and getattr(args, option) <= 0:
+            parser.error(f"--{option} must be greater than 0")
+    try:
+        args.func(args)
+    finally:
+        if args.metrics:
+            metrics.dump(args.metrics)
+            print("\n".join(metrics.summary()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+import google.ai.generativelanguage as glm
+from google.generativeai.types import content_types, generation_types
+from google.api_core.exceptions import InvalidArgument
+from Disk_Cache import DiskCache
+from Metrics import metrics, percentile
+from Model_Router import ModelRouter, split_options
+from Quota_Ledger import QuotaLedger, key_hash, short_model_name
+from Text_Normalizer import estimate_tokens
+
+# Identical (model, config, prompt) requests are answered from disk for a week.
+response_cache = DiskCache("llm_responses", max_bytes=100 * 1024 * 1024, ttl=7 * 24 * 3600)
+
+# Every request that actually goes out is booked against its key's RPM/TPM/RPD first (shared by all processes).
+quota_ledger = QuotaLedger()
+RESPONSE_ALLOWANCE = 256
+
+# Hedged requests: the hedge model is asked too once the primary is slower than this share of its recent
+# requests. Until a model has enough history the hedge waits a fixed delay instead.
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 5
+HEDGE_DEFAULT_DELAY = 15.0
+
+def normalize_model_name(model_name):
+    return model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+def normalize_prompt(prompt):
+    # Prompts come from indented f-strings, so indentation and trailing spaces carry no meaning.
+    return "\n".join(line.strip() for line in prompt.strip().splitlines())
+
+def cache_key(model_name, prompt, generation_config=None):
+    config = json.dumps(generation_config or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{normalize_model_name(model_name)}|{config}|{digest}"
+
+class KeyedModel:
+    # The generate_content of genai.GenerativeModel on a client built for one API key, so keys never
+    # share the global genai.configure.
+    def __init__(self, api_key, model_name, generation_config=None):
+        self.model_name = normalize_model_name(model_name)
+        self.generation_config = generation_types.to_generation_config_dict(generation_config or {})
+        self.client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        request = glm.GenerateContentRequest(
+            model=self.model_name,
+            contents=content_types.to_contents(contents),
+            generation_config=self.generation_config,
+        )
+        if stream:
+            with generation_types.rewrite_stream_error():
+                iterator = self.client.stream_generate_content(request, **(request_options or {}))
+            return generation_types.GenerateContentResponse.from_iterator(iterator)
+        response = self.client.generate_content(request, **(request_options or {}))
+        return generation_types.GenerateContentResponse.from_response(response)
+
+# The most recently used models are kept for the life of the process, so repeated calls (and Streamlit
+# reruns) skip client setup. Entries are keyed by a hash of the API key, never the key itself.
+MAX_MODELS = 32
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+def get_model(api_key, model_name, generation_config=None):
+    name = normalize_model_name(model_name)
+    key = (key_hash(api_key), name, json.dumps(generation_config or {}, sort_keys=True, default=str))
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = KeyedModel(api_key, name, generation_config)
+            _models[key] = model
+            while len(_models) > MAX_MODELS:
+                _models.popitem(last=False)
+        else:
+            _models.move_to_end(key)
+        return model
+
+# Models that rejected JSON mode or a response schema; they get the same prompt in plain text from then on.
+_plain_text_models = set()
+STRUCTURED_KEYS = ("response_mime_type", "response_schema")
+
+def _without_structured_output(generation_config):
+    config = {k: v for k, v in generation_config.items() if k not in STRUCTURED_KEYS}
+    return config or None
+
+def _send(model, prompt):
+    return model.generate_content(prompt)
+
+class _TimedModel:
+    # What `send` receives: the request itself is timed, so pacing done inside `send` is not counted as latency.
+    def __init__(self, model, model_name):
+        self.model = model
+        self.model_name = model_name
+
+    def generate_content(self, *args, **kwargs):
+        with metrics.timer("llm_latency_seconds", model=self.model_name):
+            return self.model.generate_content(*args, **kwargs)
+
+def _structured(model_name, generation_config):
+    # (config to send, whether it asks for structured output) for this model.
+    structured = bool(generation_config) and any(k in generation_config for k in STRUCTURED_KEYS)
+    if structured and normalize_model_name(model_name) in _plain_text_models:
+        return _without_structured_output(generation_config), False
+    return generation_config, structured
+
+def _cached_answer(prompt, model_names, generation_config):
+    # (text, model) from any acceptable model's cached answer, the preferred model's first.
+    for name in model_names:
+        cached = response_cache.get(cache_key(name, prompt, _structured(name, generation_config)[0]))
+        if cached is not None:
+            metrics.inc("llm_cache_total", result="hit")
+            return cached, name
+    metrics.inc("llm_cache_total", result="miss")
+    return None
+
+class HedgeCancelled(Exception):
+    pass
+
+def _check_cancelled(cancelled):
+    if cancelled is not None and cancelled.is_set():
+        raise HedgeCancelled("Another model answered first.")
+
+def _reserve(prompt, api_key, model_name, generation_config, cancelled=None):
+    response_tokens = (generation_config or {}).get("max_output_tokens", RESPONSE_ALLOWANCE)
+    with metrics.timer("quota_wait_seconds", model=short_model_name(model_name)):
+        reservation = quota_ledger.reserve(api_key, model_name, estimate_tokens(prompt) + response_tokens, cancelled)
+    if reservation is None:
+        raise HedgeCancelled("Another model answered first.")
+    return reservation
+
+def _settle(reservation, response, model_name):
+    model = short_model_name(model_name)
+    metrics.inc("llm_requests_total", model=model, outcome="ok")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None and getattr(usage, "total_token_count", 0):
+        quota_ledger.settle(reservation, usage.total_token_count)
+        metrics.inc("llm_input_tokens_total", usage.prompt_token_count or 0, model=model)
+        metrics.inc("llm_output_tokens_total", usage.candidates_token_count or 0, model=model)
+
+def _generate_once(prompt, api_key, model_name, generation_config, send, cancelled=None):
+    config, structured = _structured(model_name, generation_config)
+    model = get_model(api_key, model_name, config)
+    _check_cancelled(cancelled)
+    reservation = _reserve(prompt, api_key, model_name, config, cancelled)
+    response = None
+    try:
+        response = send(_TimedModel(model, short_model_name(model_name)), prompt)
+        text = response.text
+    except Exception as e:
+        if response is None:
+            # Nothing came back (a lost hedge, 429, timeout or bad key), so the request stays off the ledger.
+            quota_ledger.release(reservation)
+        if isinstance(e, HedgeCancelled):
+            raise
+        metrics.inc("llm_requests_total", model=short_model_name(model_name), outcome=type(e).__name__)
+        if not isinstance(e, InvalidArgument) or not structured or not re.search(r'json|schema|mime', str(e), re.IGNORECASE):
+            raise
+        print(f"{model_name} does not support structured output; asking in plain text instead.")
+        _plain_text_models.add(normalize_model_name(model_name))
+        return _generate_once(prompt, api_key, model_name, generation_config, send, cancelled)
+    _settle(reservation, response, model_name)
+    response_cache.put(cache_key(model_name, prompt, config), text)
+    return text
+
+def generate_text(prompt, api_key, model_name, generation_config=None, use_cache=True, send=_send,
+                  send_for=None, max_rounds=3):
+    # api_key and model_name may each hold several comma-separated options; Model_Router sends the request
+    # to the healthiest (key, model) pair and fails over on 429s, invalid keys and unavailable models.
+    # `send` lets callers wrap the raw request with their own rate limiting or retries (send_for(key)
+    # builds one per API key instead); it is skipped entirely on a cache hit.
+    return generate_routed(prompt, api_key, model_name, generation_config, use_cache, send, send_for, max_rounds)[0]
+
+def generate_routed(prompt, api_key, model_name, generation_config=None, use_cache=True, send=_send,
+                    send_for=None, max_rounds=3, cancelled=None):
+    # Like generate_text, but returns (text, model that answered); on a cache hit, the model whose answer it was.
+    if use_cache:
+        cached = _cached_answer(prompt, split_options(model_name), generation_config)
+        if cached is not None:
+            return cached
+
+    def attempt(key, name):
+        return _generate_once(prompt, key, name, generation_config, send_for(key) if send_for else send, cancelled)
+
+    text, (_, answered_by) = ModelRouter(api_key, model_name).call(attempt, max_rounds)
+    return text, answered_by
+
+class _HedgeGuard:
+    # Wraps the model `send` receives, so a hedged request that lost the race while `send` was pacing it
+    # (e.g. waiting for its rate limiter) is dropped before it goes out; its ledger booking is given back.
+    def __init__(self, model, cancelled):
+        self.model = model
+        self.cancelled = cancelled
+
+    def generate_content(self, *args, **kwargs):
+        _check_cancelled(self.cancelled)
+        return self.model.generate_content(*args, **kwargs)
+
+def hedge_delay(model_name, fraction=HEDGE_PERCENTILE):
+    # Seconds to wait for the first of model_name's options before hedging: its observed latency percentile.
+    samples = metrics.samples("llm_latency_seconds", model=short_model_name(split_options(model_name)[0]))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return percentile(samples, fraction)
+
+def generate_hedged(prompt, api_key, model_name, hedge_model, generation_config=None, use_cache=True, send=_send,
+                    send_for=None, max_rounds=3, hedge_percentile=HEDGE_PERCENTILE, accept=None):
+    # Like generate_routed, but when model_name has not answered within hedge_percentile of its observed
+    # latency (or has already failed) the same prompt also goes to hedge_model. The first answer that passes
+    # accept(text) wins. The other request is cancelled if it has not been sent yet: it stops waiting for the
+    # quota ledger or `send`'s pacing and books nothing. A request already on the wire cannot be recalled, so
+    # its answer is discarded (it still lands in the response cache).
+    # If neither answer is acceptable, the primary's answer or error is returned as generate_routed would.
+    if use_cache:
+        cached = _cached_answer(prompt, split_options(model_name) + split_options(hedge_model), generation_config)
+        if cached is not None and (accept is None or accept(cached[0])):
+            return cached
+
+    cancelled = threading.Event()
+    answers = queue.Queue()
+
+    def guarded(inner):
+        def send_guarded(model, text):
+            # Checked before `send` runs, so a cancelled request does not take a rate limiter slot either.
+            _check_cancelled(cancelled)
+            return inner(_HedgeGuard(model, cancelled), text)
+        return send_guarded
+
+    def run(name, primary):
+        try:
+            answer = generate_routed(prompt, api_key, name, generation_config, False, guarded(send),
+                                     (lambda key: guarded(send_for(key))) if send_for else None, max_rounds,
+                                     cancelled)
+            answers.put((primary, answer, None))
+        except Exception as e:
+            answers.put((primary, None, e))
+
+    def launch(name, primary):
+        threading.Thread(target=run, args=(name, primary), daemon=True).start()
+
+    launch(model_name, True)
+    deadline = time.monotonic() + hedge_delay(model_name, hedge_percentile)
+    pending, hedged, fallback = 1, False, None
+    while pending:
+        try:
+            primary, answer, error = answers.get(timeout=None if hedged else max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            primary, answer, error = None, None, None
+        if primary is not None:
+            pending -= 1
+            if error is None and (accept is None or accept(answer[0])):
+                cancelled.set()
+                if hedged:
+                    metrics.inc("llm_hedge_winner_total", model=short_model_name(answer[1]))
+                return answer
+            if primary:
+                fallback = (answer, error)
+        if not hedged:
+            # Too slow, or already failed: race the hedge model.
+            hedged, pending = True, pending + 1
+            metrics.inc("llm_hedged_total", model=short_model_name(split_options(model_name)[0]))
+            launch(hedge_model, False)
+    answer, error = fallback
+    if error is not None:
+        raise error
+    return answer
+
+def stream_text(prompt, api_key, model_name, generation_config=None, use_cache=True):
+    # Yields the answer chunk by chunk as Gemini produces it; a cached answer arrives as one chunk.
+    # Fails over to another key or model only until the first chunk has arrived.
+    if use_cache:
+        cached = _cached_answer(prompt, split_options(model_name), generation_config)
+        if cached is not None:
+            yield cached[0]
+            return
+
+    def attempt(key, name):
+        model = get_model(key, name, generation_config)
+        reservation = _reserve(prompt, key, name, generation_config)
+        start = time.perf_counter()
+        parts = []
+        try:
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                if not parts:
+                    metrics.observe("llm_first_token_seconds", time.perf_counter() - start, model=short_model_name(name))
+                parts.append(chunk.text)
+                yield chunk.text
+        except Exception as e:
+            if not parts:
+                quota_ledger.release(reservation)
+            metrics.inc("llm_requests_total", model=short_model_name(name), outcome=type(e).__name__)
+            raise
+        metrics.observe("llm_latency_seconds", time.perf_counter() - start, model=short_model_name(name))
+        _settle(reservation, response, name)
+        response_cache.put(cache_key(name, prompt, generation_config), "".join(parts))
+
+    yield from ModelRouter(api_key, model_name).stream(attempt)
+
+def cache_stats():
+    return response_cache.stats()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+from Disk_Cache import DiskCache
+from Scoring_Engine import generate_with_retries
+from Text_Normalizer import estimate_tokens
+
+# Bump when the profile prompt or format changes so old profiles are rebuilt.
+PROFILE_VERSION = "1"
+PROFILE_RESPONSE_TOKENS = 400
+
+profile_cache = DiskCache("jd_profiles", max_bytes=20 * 1024 * 1024)
+
+def jd_hash(job_text):
+    return hashlib.sha256(job_text.strip().encode("utf-8")).hexdigest()
+
+def build_profile_prompt(job_text):
+    return f"""
+    Summarize the following job description into a compact profile used to screen resumes.
+    Leave out company boilerplate, benefits, salary and equal-opportunity statements.
+
+    Respond with only a JSON object and nothing else, in this format:
+    {{"role": "Data Analyst", "experience_required": "0-1 years", "required_skills": ["SQL", "Python"], "must_haves": ["Bachelor's degree"], "nice_to_haves": ["Tableau"]}}
+
+    Job Description:
+    {job_text}
+    """
+
+def parse_profile(response_text):
+    start, end = response_text.find("{"), response_text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        profile = json.loads(response_text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(profile, dict) or not profile.get("role") or not isinstance(profile.get("required_skills"), list):
+        return None
+    return profile
+
+def format_profile(profile):
+    def join(values):
+        return ", ".join(str(value) for value in values) if isinstance(values, list) else str(values)
+
+    lines = [
+        f"Role: {profile['role']}",
+        f"Experience Required: {profile.get('experience_required') or 'Not specified'}",
+        f"Required Skills: {join(profile['required_skills'])}",
+    ]
+    if profile.get("must_haves"):
+        lines.append(f"Must-Haves: {join(profile['must_haves'])}")
+    if profile.get("nice_to_haves"):
+        lines.append(f"Nice-to-Haves: {join(profile['nice_to_haves'])}")
+    return "\n".join(lines)
+
+def get_jd_profile(job_text, api_key, model_name, limiter=None):
+    # Built once per JD (keyed by its content hash) and reused by every per-resume prompt.
+    # Falls back to the raw JD whenever a usable, smaller profile can't be produced.
+    key = f"{PROFILE_VERSION}:{jd_hash(job_text)}"
+    cached = profile_cache.get(key)
+    if cached is not None:
+        return cached
+
+    response_text = generate_with_retries(build_profile_prompt(job_text), api_key, model_name,
+                                          limiter=limiter, response_tokens=PROFILE_RESPONSE_TOKENS)
+    profile = parse_profile(response_text)
+    if profile is None:
+        return job_text
+
+    profile_text = format_profile(profile)
+    if estimate_tokens(profile_text) >= estimate_tokens(job_text):
+        profile_text = job_text
+    profile_cache.put(key, profile_text)
+    return profile_text
@@ -0,0 +1,49 @@
+import re
+from collections import Counter
+import numpy as np
+
+# Keeps tokens such as "c++", "c#" and "node.js" intact without swallowing a sentence's full stop.
+TOKEN_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9+#.]*[a-z0-9+#])?")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "our", "the", "this", "to", "we", "will", "with", "you", "your"
+}
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def bm25_scores(query_text, documents, k1=1.5, b=0.75):
+    query_terms = sorted(set(tokenize(query_text)))
+    if not documents or not query_terms:
+        return np.zeros(len(documents), dtype=np.float32)
+
+    # Term-frequency matrix restricted to the query vocabulary (documents x query terms).
+    # Counter does the per-token work in C; only the query terms are looked up afterwards.
+    tf = np.zeros((len(documents), len(query_terms)), dtype=np.float32)
+    doc_len = np.zeros(len(documents), dtype=np.float32)
+    for row, doc in enumerate(documents):
+        counts = Counter(TOKEN_PATTERN.findall(doc.lower()))
+        doc_len[row] = sum(counts.values())
+        tf[row] = [counts.get(term, 0) for term in query_terms]
+
+    avg_len = doc_len.mean() or 1.0
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(documents) - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    return (tf * (k1 + 1) / (tf + norm[:, None])) @ idf
+
+def rank_top_k(query_text, documents, k):
+    scores = bm25_scores(query_text, documents)
+    k = min(max(k, 0), len(documents))
+    if k == 0:
+        return [], scores
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top.tolist(), scores
+
+def to_percentages(scores):
+    # BM25 has no fixed scale, so fast mode reports scores relative to the best resume.
+    best = float(np.max(scores)) if len(scores) else 0.0
+    if best <= 0:
+        return [0.0] * len(scores)
+    return [round(float(score) / best * 100, 1) for score in scores]
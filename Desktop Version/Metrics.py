@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from Disk_Cache import CACHE_DIR
+
+# Latency buckets in seconds, from a cached PDF page up to a slow long-context model answer.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Recent samples kept per histogram for the p50/p95 shown in the stats panel.
+SAMPLE_LIMIT = 1000
+
+METRICS_DIR = os.path.join(CACHE_DIR, "metrics")
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _label_text(label_key):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in label_key) + "}" if label_key else ""
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_LIMIT)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+class Metrics:
+    # Process-wide counters and histograms, labelled by stage details such as the model or file format.
+    # Names follow Prometheus conventions: *_total for counters, *_seconds / *_tokens for histograms.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def samples(self, name, **labels):
+        # The recent observations behind a histogram, e.g. for a latency percentile; [] if none yet.
+        key = (name, _label_key(labels))
+        with self._lock:
+            return list(self.histograms[key].samples) if key in self.histograms else []
+
+    def all_samples(self, name):
+        # The recent observations of a histogram under every label set, e.g. all models together.
+        with self._lock:
+            return [v for (n, _), h in self.histograms.items() if n == name for v in h.samples]
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": h.count, "sum": h.total,
+                           "p50": percentile(h.samples, 0.5), "p95": percentile(h.samples, 0.95),
+                           "buckets": dict(zip(map(str, BUCKETS), h.buckets))}
+                          for (name, labels), h in sorted(self.histograms.items())]
+        return {"started": self.started, "elapsed_seconds": time.time() - self.started,
+                "counters": counters, "histograms": histograms}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        typed = set()
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE fresalyzer_{name} counter")
+                lines.append(f"fresalyzer_{name}{_label_text(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE fresalyzer_{name} histogram")
+                for bound, count in zip(BUCKETS, h.buckets):
+                    lines.append(f"fresalyzer_{name}_bucket{_label_text(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"fresalyzer_{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {h.count}")
+                lines.append(f"fresalyzer_{name}_sum{_label_text(labels)} {h.total}")
+                lines.append(f"fresalyzer_{name}_count{_label_text(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # .prom / .txt get the Prometheus text format, anything else JSON.
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        text = self.to_prometheus() if os.path.splitext(path)[1].lower() in (".prom", ".txt") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary(self):
+        # Human-readable lines for the stats panels: where the time went, then the counts.
+        snapshot = self.snapshot()
+        lines = [f"Elapsed: {snapshot['elapsed_seconds']:.1f}s"]
+        for h in sorted(snapshot["histograms"], key=lambda h: h["sum"], reverse=True):
+            labels = ", ".join(f"{k}={v}" for k, v in h["labels"].items())
+            lines.append(f"{h['name']}{' (' + labels + ')' if labels else ''}: n={h['count']} total={h['sum']:.2f} "
+                         f"p50={h['p50']:.3f} p95={h['p95']:.3f}")
+        for c in snapshot["counters"]:
+            labels = ", ".join(f"{k}={v}" for k, v in c["labels"].items())
+            lines.append(f"{c['name']}{' (' + labels + ')' if labels else ''}: {c['value']:g}")
+        return lines
+
+metrics = Metrics()
+
+def save_run(mode):
+    # Written at the end of every run, so the numbers outlive the window (counts are since the mode was launched).
+    path = os.path.join(METRICS_DIR, f"{mode}_last_run.json")
+    metrics.dump(path)
+    return path
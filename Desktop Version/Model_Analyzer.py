@@ -1,108 +1,86 @@
 import tkinter as tk
-from tkinter import filedialog, ttk, messagebox, scrolledtext
-import fitz  # PyMuPDF
-import docx
-import os
-import re
-import google.generativeai as genai
+from tkinter import filedialog, messagebox, scrolledtext
+import queue
+import threading
 import matplotlib.pyplot as plt
-from google.api_core.exceptions import ResourceExhausted, InvalidArgument
-
-models = [
-    "models/gemini-1.5-pro-latest",
-    "models/gemini-1.5-flash-latest",
-    "models/gemini-1.5-pro-002",
-    "models/gemini-1.5-pro-001",
-    "models/gemini-1.5-pro",
-    "models/gemini-2.0-flash",
-    "models/gemini-2.0-flash-lite",
-    "models/gemini-2.5-flash-preview-04-17",
-    "models/gemini-2.0-flash-thinking-exp-01-21",
-    "models/gemini-2.5-pro-exp-03-25",
-    "models/gemini-2.0-flash-lite-preview-02-05",
-    "models/gemini-1.5-flash-8b",
-    "models/gemini-1.5-flash-002",
-    "models/gemini-2.0-pro-exp"
-]
-
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    return "\n".join([page.get_text() for page in doc])
-
-def extract_text_from_docx(docx_path):
-    doc = docx.Document(docx_path)
-    return "\n".join([para.text for para in doc.paragraphs])
-
-def extract_text_from_file(file_path):
-    _, ext = os.path.splitext(file_path.lower())
-    try:
-        if ext == ".pdf":
-            return extract_text_from_pdf(file_path)
-        elif ext == ".docx":
-            return extract_text_from_docx(file_path)
-        elif ext == ".txt":
-            with open(file_path, encoding="utf-8") as f:
-                return f.read()
-        else:
-            return f"Unsupported file format: {ext}"
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
-
-def extract_match_percentage(text):
-    match = re.search(r'(\d+(?:\.\d+)?)\s*%', text)
-    return float(match.group(1)) if match else 0.0
-
-def analyze_resume_with_all_models(resume_text, job_desc_text, api_key):
-    genai.configure(api_key=api_key)
-    prompt = f"""
-    Analyze the resume and job description. Return only the match percentage as a single number in this format:
-    Match Percentage: 85%
-
-    Resume:
-    {resume_text}
-
-    Job Description:
-    {job_desc_text}
-    """
-    results = {}
-    for model_name in models:
-        try:
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            score = extract_match_percentage(response.text)
-            results[model_name] = {"score": score, "error": None}
-        except ResourceExhausted:
-            results[model_name] = {"score": 0.0, "error": "Quota Exceeded"}
-        except InvalidArgument:
-            results[model_name] = {"score": 0.0, "error": "Invalid API Key"}
-        except Exception as e:
-            err = str(e)
-            if "API key" in err.lower():
-                results[model_name] = {"score": 0.0, "error": "API Key Error"}
-            else:
-                results[model_name] = {"score": 0.0, "error": err[:30] + ('...' if len(err) > 30 else '')}
-    return results
-
-def plot_match_percentages(results):
-    plt.figure(figsize=(14, 7))
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from Model_Comparison import (models, analyze_resume_with_all_models, load_dataset,
+                              evaluate_models, save_evaluation, load_evaluation, pick_model, format_evaluation,
+                              DEFAULT_TOLERANCE, DEFAULT_MIN_ACCURACY)
+from Text_Extractor import extract_text_from_file
+from Text_Normalizer import normalize_text, format_report
+from Metrics import metrics, save_run
+from Stats_Panel import show_stats_panel
+
+def plot_match_percentages(results, ax=None):
+    standalone = ax is None
+    if standalone:
+        plt.figure(figsize=(14, 7))
+        ax = plt.gca()
+    ax.clear()
     names = list(results.keys())
     scores = [results[m]['score'] for m in names]
     errors = [results[m]['error'] for m in names]
-    colors = ['red' if err else 'skyblue' for err in errors]
+    colors = ['lightgray' if err == "Pending" else 'red' if err else 'skyblue' for err in errors]
 
-    bars = plt.bar(names, scores, color=colors)
-    plt.ylabel("Match Percentage")
-    plt.title("Match Percentage vs Models")
-    plt.ylim(0, 100)
-    plt.xticks(rotation=30, ha='right', fontsize=9)
+    bars = ax.bar(names, scores, color=colors)
+    ax.set_ylabel("Match Percentage")
+    ax.set_title("Match Percentage vs Models")
+    ax.set_ylim(0, 100)
+    ax.tick_params(axis='x', labelsize=9)
+    for tick in ax.get_xticklabels():
+        tick.set_rotation(30)
+        tick.set_horizontalalignment('right')
 
     for bar, score, err in zip(bars, scores, errors):
         label = err if err else f"{score:.1f}%"
         y = bar.get_height() + 1
-        plt.text(bar.get_x() + bar.get_width()/2.0, y, label, ha='center', va='bottom', fontsize=8, rotation=90 if err else 0)
+        ax.text(bar.get_x() + bar.get_width()/2.0, y, label, ha='center', va='bottom', fontsize=8, rotation=90 if err else 0)
+
+    if standalone:
+        plt.tight_layout()
+        plt.show()
 
-    plt.tight_layout()
-    plt.show()
+def plot_efficiency(evaluation, ax, min_accuracy=DEFAULT_MIN_ACCURACY):
+    # Accuracy against median latency: the best models sit top-left. The recommended one is drawn in green.
+    ax.clear()
+    best = pick_model(evaluation, min_accuracy)
+    measured = [m for m in evaluation["models"] if m["latency_p50"] is not None]
+    for m in measured:
+        chosen = best is not None and m["model"] == best["model"]
+        ax.scatter(m["latency_p50"], m["accuracy"], s=60 + 4 * m["error_rate"],
+                   color="green" if chosen else "red" if m["error_rate"] else "skyblue", edgecolors="black")
+        ax.annotate(m["model"], (m["latency_p50"], m["accuracy"]), fontsize=8, xytext=(4, 4), textcoords="offset points")
+    ax.axhline(min_accuracy, color="gray", linestyle="--", linewidth=1)
+    ax.set_xlabel("Median latency (s)")
+    ax.set_ylabel(f"Accuracy % (within {evaluation['tolerance']} points of the label)")
+    ax.set_title("Measured Model Efficiency (marker size = error rate)")
+    ax.set_ylim(0, 105)
+
+def show_efficiency_window(parent, min_accuracy=DEFAULT_MIN_ACCURACY):
+    # Shared by every mode's "Show Model's Efficiencies" button; everything comes from the last saved evaluation.
+    evaluation = load_evaluation()
+    if evaluation is None:
+        messagebox.showinfo("No Measurements Yet", "Run \"Evaluate Models\" in Model Analyzer (or FResAlyzer_CLI.py evaluate) "
+                            "on a labelled resume/JD dataset first.", parent=parent)
+        return
+    win = tk.Toplevel(parent)
+    win.title("Model Efficiencies (measured)")
+    win.geometry("1000x800")
+    text_box = scrolledtext.ScrolledText(win, wrap=tk.NONE, height=20, font=("Courier", 9))
+    text_box.insert(tk.END, format_evaluation(evaluation, min_accuracy))
+    text_box.pack(fill="x")
+    figure = Figure(figsize=(10, 5))
+    ax = figure.add_subplot(111)
+    plot_efficiency(evaluation, ax, min_accuracy)
+    figure.tight_layout()
+    canvas = FigureCanvasTkAgg(figure, master=win)
+    canvas.get_tk_widget().pack(expand=True, fill="both")
+    canvas.draw()
+
+def format_results(results):
+    return "\n".join([f"{model}: {res['score']:.1f}%" if not res['error'] else f"{model}: ERROR - {res['error']}" for model, res in results.items()])
 
 def main():
     def upload_resume():
@@ -124,27 +102,128 @@ def main():
             messagebox.showerror("Input Error", "All fields are required.")
             return
 
-        resume_text = extract_text_from_file(resume_path)
-        job_text = extract_text_from_file(job_path)
+        report = {}
+        resume_text = normalize_text(extract_text_from_file(resume_path), report=report)
+        job_text = normalize_text(extract_text_from_file(job_path), report=report)
+        print(format_report(report))
+
+        results = {model: {"score": 0.0, "error": "Pending"} for model in models}
+        updates = queue.Queue()
+
+        result_window = tk.Toplevel(root)
+        result_window.title("Match Percentages")
+        result_window.geometry("1100x800")
+        text_box = scrolledtext.ScrolledText(result_window, wrap=tk.WORD, height=16)
+        text_box.pack(fill="x")
+
+        figure = Figure(figsize=(11, 5.5))
+        ax = figure.add_subplot(111)
+        canvas = FigureCanvasTkAgg(figure, master=result_window)
+        canvas.get_tk_widget().pack(expand=True, fill="both")
+
+        def redraw():
+            with metrics.timer("ui_render_seconds", mode="model_analyzer"):
+                text_box.delete("1.0", tk.END)
+                text_box.insert(tk.END, format_results(results))
+                plot_match_percentages(results, ax)
+                figure.tight_layout()
+                canvas.draw_idle()
+
+        def worker():
+            try:
+                analyze_resume_with_all_models(resume_text, job_text, api_key,
+                                               on_result=lambda model, res: updates.put((model, res)))
+            except Exception as e:
+                updates.put((None, str(e)))
+            updates.put(None)
+
+        def poll():
+            # A closed window is no longer redrawn; the results are still collected to the end.
+            shown = bool(result_window.winfo_exists())
+            changed = False
+            while True:
+                try:
+                    item = updates.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    if shown:
+                        redraw()
+                    save_run("model_analyzer")
+                    return
+                model, res = item
+                if model is None:
+                    messagebox.showerror("Error", res)
+                    continue
+                results[model] = res
+                changed = True
+            if changed and shown:
+                redraw()
+            (result_window if shown else root).after(200, poll)
+
+        redraw()
+        threading.Thread(target=worker, daemon=True).start()
+        result_window.after(200, poll)
 
+    def upload_dataset():
+        path = filedialog.askopenfilename(filetypes=[("Labelled dataset", "*.csv")])
+        dataset_entry.delete(0, tk.END)
+        dataset_entry.insert(0, path)
+
+    def evaluate():
+        api_key = api_entry.get()
+        dataset_path = dataset_entry.get()
+        if not all([api_key, dataset_path]):
+            messagebox.showerror("Input Error", "An API key and a labelled dataset (CSV) are required.")
+            return
         try:
-            results = analyze_resume_with_all_models(resume_text, job_text, api_key)
-            result_text = "\n".join([f"{model}: {res['score']:.1f}%" if not res['error'] else f"{model}: ERROR - {res['error']}" for model, res in results.items()])
-            result_window = tk.Toplevel(root)
-            result_window.title("Match Percentages")
-            result_window.geometry("800x400")
-            text_box = scrolledtext.ScrolledText(result_window, wrap=tk.WORD)
-            text_box.insert(tk.END, result_text)
-            text_box.pack(expand=True, fill="both")
-            plot_match_percentages(results)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+            tolerance = float(tolerance_entry.get())
+            min_accuracy = float(min_accuracy_entry.get())
+            items = load_dataset(dataset_path)
+        except ValueError as e:
+            messagebox.showerror("Input Error", f"Please check the tolerance, minimum accuracy and dataset: {e}")
+            return
+
+        updates = queue.Queue()
+        evaluate_button.config(state=tk.DISABLED)
+
+        def worker():
+            try:
+                evaluation = evaluate_models(items, api_key, tolerance=tolerance,
+                                             on_progress=lambda done, total: updates.put(("progress", done, total)))
+                save_evaluation(evaluation)
+                updates.put(("done",))
+            except Exception as e:
+                updates.put(("error", str(e)))
+
+        def poll():
+            while True:
+                try:
+                    update = updates.get_nowait()
+                except queue.Empty:
+                    break
+                if update[0] == "progress":
+                    progress_label.config(text=f"Evaluated {update[1]} of {update[2]} model answer(s)...")
+                    continue
+                evaluate_button.config(state=tk.NORMAL)
+                if update[0] == "error":
+                    progress_label.config(text="")
+                    messagebox.showerror("Evaluation Failed", update[1])
+                else:
+                    progress_label.config(text="Evaluation saved.")
+                    save_run("model_evaluation")
+                    show_efficiency_window(root, min_accuracy)
+                return
+            root.after(500, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        root.after(500, poll)
 
     root = tk.Tk()
     root.title("FrResAlyzer - Model Analyzer")
-    root.geometry("600x400")
+    root.geometry("600x600")
 
-    tk.Label(root, text="Google API Key:").pack()
+    tk.Label(root, text="Google API Key(s), comma-separated:").pack()
     api_entry = tk.Entry(root, width=60, show='*')
     api_entry.pack()
 
@@ -158,7 +237,35 @@ def main():
     job_desc_entry.pack()
     tk.Button(root, text="Browse", command=upload_job_desc).pack()
 
-    tk.Button(root, text="Analyze", command=analyze, bg="green", fg="white").pack(pady=10)
+    action_frame = tk.Frame(root)
+    action_frame.pack(pady=10)
+    tk.Button(action_frame, text="Analyze", command=analyze, bg="green", fg="white").pack(side="left", padx=5)
+    tk.Button(action_frame, text="Show Stats", command=lambda: show_stats_panel(root, "model_analyzer")).pack(side="left", padx=5)
+
+    tk.Label(root, text="Labelled Dataset (CSV with resume, jd, label columns):").pack(pady=(15, 0))
+    dataset_entry = tk.Entry(root, width=60)
+    dataset_entry.pack()
+    tk.Button(root, text="Browse", command=upload_dataset).pack()
+
+    eval_frame = tk.Frame(root)
+    eval_frame.pack(pady=5)
+    tk.Label(eval_frame, text="Agreement Tolerance (points):").pack(side="left", padx=2)
+    tolerance_entry = tk.Entry(eval_frame, width=6)
+    tolerance_entry.insert(0, str(DEFAULT_TOLERANCE))
+    tolerance_entry.pack(side="left", padx=2)
+    tk.Label(eval_frame, text="Minimum Accuracy %:").pack(side="left", padx=2)
+    min_accuracy_entry = tk.Entry(eval_frame, width=6)
+    min_accuracy_entry.insert(0, str(DEFAULT_MIN_ACCURACY))
+    min_accuracy_entry.pack(side="left", padx=2)
+
+    eval_actions = tk.Frame(root)
+    eval_actions.pack(pady=5)
+    evaluate_button = tk.Button(eval_actions, text="Evaluate Models", command=evaluate, bg="blue", fg="white")
+    evaluate_button.pack(side="left", padx=5)
+    tk.Button(eval_actions, text="Show Model's Efficiencies",
+              command=lambda: show_efficiency_window(root, float(min_accuracy_entry.get() or DEFAULT_MIN_ACCURACY))).pack(side="left", padx=5)
+    progress_label = tk.Label(root, text="")
+    progress_label.pack()
 
     root.mainloop()
 
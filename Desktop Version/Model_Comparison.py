@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from google.api_core.exceptions import ResourceExhausted, InvalidArgument, DeadlineExceeded
+from Disk_Cache import CACHE_DIR
+from Gemini_Client import generate_text
+from Metrics import percentile
+from Quota_Ledger import short_model_name
+from Response_Parser import SCORE_SCHEMA, json_config, parse_match, validate_percentage
+from Text_Extractor import extract_text_from_file
+from Text_Normalizer import normalize_text
+
+models = [
+    "models/gemini-1.5-pro-latest",
+    "models/gemini-1.5-flash-latest",
+    "models/gemini-1.5-pro-002",
+    "models/gemini-1.5-pro-001",
+    "models/gemini-1.5-pro",
+    "models/gemini-2.0-flash",
+    "models/gemini-2.0-flash-lite",
+    "models/gemini-2.5-flash-preview-04-17",
+    "models/gemini-2.0-flash-thinking-exp-01-21",
+    "models/gemini-2.5-pro-exp-03-25",
+    "models/gemini-2.0-flash-lite-preview-02-05",
+    "models/gemini-1.5-flash-8b",
+    "models/gemini-1.5-flash-002",
+    "models/gemini-2.0-pro-exp"
+]
+
+# Seconds each model gets before it is reported as timed out.
+MODEL_DEADLINE = 60
+
+def query_model(model_name, prompt, api_key, deadline=MODEL_DEADLINE, max_attempts=2, use_cache=True, max_rounds=0):
+    # Besides the score, reports the request's own latency and token usage (None when answered from the cache).
+    # By default a rate-limited model is reported rather than waited for; max_rounds > 0 waits it out.
+    usage = {"latency": None, "input_tokens": None, "output_tokens": None}
+
+    def send(model, prompt):
+        start = time.perf_counter()
+        response = model.generate_content(prompt, request_options={"timeout": deadline})
+        usage["latency"] = time.perf_counter() - start
+        meta = getattr(response, "usage_metadata", None)
+        if meta is not None:
+            usage["input_tokens"] = meta.prompt_token_count
+            usage["output_tokens"] = meta.candidates_token_count
+        return response
+
+    return dict(_query_score(model_name, prompt, api_key, send, max_attempts, use_cache, max_rounds), **usage)
+
+def _query_score(model_name, prompt, api_key, send, max_attempts, use_cache, max_rounds):
+    try:
+        for attempt in range(max_attempts):
+            # Only a model whose answer fails validation is asked again, and not from the cache.
+            result = parse_match(generate_text(prompt, api_key, model_name, json_config(SCORE_SCHEMA),
+                                               use_cache=use_cache and attempt == 0, send=send, max_rounds=max_rounds))
+            if result:
+                return {"score": result[1], "error": None}
+        return {"score": 0.0, "error": "Invalid Response"}
+    except ResourceExhausted:
+        return {"score": 0.0, "error": "Quota Exceeded"}
+    except InvalidArgument:
+        return {"score": 0.0, "error": "Invalid API Key"}
+    except DeadlineExceeded:
+        return {"score": 0.0, "error": "Timed Out"}
+    except Exception as e:
+        err = str(e)
+        if "API key" in err.lower():
+            return {"score": 0.0, "error": "API Key Error"}
+        return {"score": 0.0, "error": err[:30] + ('...' if len(err) > 30 else '')}
+
+def build_score_prompt(resume_text, job_desc_text):
+    return f"""
+    Analyze the resume and job description. Respond with only a JSON object holding the match percentage, for example:
+    {{"match_percentage": 85}}
+
+    Resume:
+    {resume_text}
+
+    Job Description:
+    {job_desc_text}
+    """
+
+def analyze_resume_with_all_models(resume_text, job_desc_text, api_key, deadline=MODEL_DEADLINE, on_result=None):
+    prompt = build_score_prompt(resume_text, job_desc_text)
+    # Every model is queried at once; the slowest model within its deadline sets the total time.
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=len(models))
+    futures = {pool.submit(query_model, model_name, prompt, api_key, deadline): model_name for model_name in models}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            model_name = futures[future]
+            results[model_name] = future.result()
+            if on_result:
+                on_result(model_name, results[model_name])
+    except FuturesTimeout:
+        for future, model_name in futures.items():
+            if model_name not in results:
+                future.cancel()
+                results[model_name] = {"score": 0.0, "error": "Timed Out"}
+                if on_result:
+                    on_result(model_name, results[model_name])
+    finally:
+        # Stragglers are abandoned; their own request timeout ends them shortly after.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return {model_name: results[model_name] for model_name in models}
+
+# Labelled evaluation. The dataset is a CSV with resume, jd and label columns: paths relative to the CSV
+# and the match percentage a recruiter would give the pair. A model agrees with a label when its score is
+# within `tolerance` points of it; errors count as disagreements.
+EVALUATION_FILE = os.path.join(CACHE_DIR, "model_evaluation.json")
+DEFAULT_TOLERANCE = 15
+DEFAULT_MIN_ACCURACY = 80
+# A measurement should not fail on a passing 429, so evaluation waits for the model's quota to reopen.
+EVALUATION_WAIT_ROUNDS = 3
+
+def load_dataset(csv_path):
+    base = os.path.dirname(os.path.abspath(csv_path))
+    items = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.DictReader(f), 2):
+            label = validate_percentage(row.get("label") or "")
+            if not row.get("resume") or not row.get("jd") or label is None:
+                raise ValueError(f"{os.path.basename(csv_path)} line {line}: needs resume, jd and a 0-100 label")
+            items.append({"resume": os.path.join(base, row["resume"].strip()),
+                          "jd": os.path.join(base, row["jd"].strip()), "label": label})
+    return items
+
+def evaluate_models(items, api_key, model_names=None, tolerance=DEFAULT_TOLERANCE, deadline=MODEL_DEADLINE,
+                    on_progress=None):
+    # Every model answers every pair fresh (never from the cache), so latency and tokens are real measurements.
+    model_names = model_names or models
+    texts = {}
+
+    def text_of(path):
+        if path not in texts:
+            text = extract_text_from_file(path)
+            if text.startswith("Error"):
+                raise ValueError(f"{os.path.basename(path)}: {text}")
+            texts[path] = normalize_text(text)
+        return texts[path]
+
+    rows = []
+    total = len(items) * len(model_names)
+    with ThreadPoolExecutor(max_workers=len(model_names)) as pool:
+        for index, item in enumerate(items):
+            prompt = build_score_prompt(text_of(item["resume"]), text_of(item["jd"]))
+            futures = {pool.submit(query_model, name, prompt, api_key, deadline, use_cache=False,
+                                   max_rounds=EVALUATION_WAIT_ROUNDS): name for name in model_names}
+            for future in as_completed(futures):
+                rows.append(dict(future.result(), item=index, model=short_model_name(futures[future]),
+                                 label=item["label"]))
+                if on_progress:
+                    on_progress(len(rows), total)
+
+    return {"created": time.time(), "tolerance": tolerance, "items": len(items),
+            "models": summarize_evaluation(rows, [short_model_name(name) for name in model_names], tolerance),
+            "rows": rows}
+
+def summarize_evaluation(rows, model_names, tolerance):
+    summary = []
+    for name in model_names:
+        mine = [row for row in rows if row["model"] == name]
+        answered = [row for row in mine if not row["error"]]
+        latencies = [row["latency"] for row in answered if row["latency"] is not None]
+        agreed = sum(abs(row["score"] - row["label"]) <= tolerance for row in answered)
+        summary.append({
+            "model": name,
+            "requests": len(mine),
+            "accuracy": round(100 * agreed / len(mine), 1) if mine else None,
+            "mae": round(sum(abs(row["score"] - row["label"]) for row in answered) / len(answered), 1) if answered else None,
+            "error_rate": round(100 * (len(mine) - len(answered)) / len(mine), 1) if mine else None,
+            "errors": dict(Counter(row["error"] for row in mine if row["error"])),
+            "latency_p50": round(percentile(latencies, 0.5), 3) if latencies else None,
+            "latency_p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+            "input_tokens": sum(row["input_tokens"] or 0 for row in answered),
+            "output_tokens": sum(row["output_tokens"] or 0 for row in answered),
+        })
+    return summary
+
+def save_evaluation(evaluation, path=EVALUATION_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(evaluation, f, indent=2)
+
+def load_evaluation(path=EVALUATION_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def pick_model(evaluation, min_accuracy=DEFAULT_MIN_ACCURACY):
+    # The fastest measured model (median latency) whose accuracy reaches min_accuracy, or None.
+    eligible = [m for m in evaluation["models"] if m["accuracy"] is not None and m["accuracy"] >= min_accuracy
+                and m["latency_p50"] is not None]
+    return min(eligible, key=lambda m: m["latency_p50"]) if eligible else None
+
+def format_evaluation(evaluation, min_accuracy=DEFAULT_MIN_ACCURACY):
+    lines = [f"{evaluation['items']} labelled pair(s), agreement within {evaluation['tolerance']} points", "",
+             f"{'Model':<40}{'Acc %':>7}{'MAE':>7}{'p50 s':>8}{'p95 s':>8}{'Err %':>7}{'Tokens in/out':>16}"]
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    for m in sorted(evaluation["models"], key=lambda m: -(m["accuracy"] or 0)):
+        lines.append(f"{m['model']:<40}{fmt(m['accuracy'], '.1f'):>7}{fmt(m['mae'], '.1f'):>7}"
+                     f"{fmt(m['latency_p50'], '.2f'):>8}{fmt(m['latency_p95'], '.2f'):>8}{fmt(m['error_rate'], '.1f'):>7}"
+                     f"{str(m['input_tokens']) + '/' + str(m['output_tokens']):>16}")
+    best = pick_model(evaluation, min_accuracy)
+    lines.append("")
+    lines.append(f"Fastest model with at least {min_accuracy}% accuracy: {best['model']}" if best
+                 else f"No model reached {min_accuracy}% accuracy.")
+    return "\n".join(lines)
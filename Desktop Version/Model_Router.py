@@ -0,0 +1,161 @@
+import re
+import threading
+import time
+from google.api_core.exceptions import (ResourceExhausted, NotFound, PermissionDenied, DeadlineExceeded,
+                                        ServiceUnavailable, InternalServerError)
+from Metrics import metrics
+from Quota_Ledger import MAX_WAIT
+
+# A route is one (API key, model) pair. Rate-limited routes sit out their retry delay, routes that keep
+# failing are switched off for a while (circuit breaker), and the rest are ranked by recent latency.
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN = 60
+THROTTLE_COOLDOWN = 20
+THROTTLE_WINDOW = 300
+LATENCY_ALPHA = 0.3
+
+# Errors that say something about the route rather than the request; the next route is tried straight away.
+ROUTE_ERRORS = (ResourceExhausted, NotFound, PermissionDenied, DeadlineExceeded, ServiceUnavailable, InternalServerError)
+
+def split_options(value):
+    # "key1, key2" -> ["key1", "key2"]; lists pass through.
+    items = value.split(",") if isinstance(value, str) else value
+    return [item.strip() for item in items if item and item.strip()]
+
+def retry_delay_hint(error):
+    # 429s carry a RetryInfo detail, e.g. "retry_delay { seconds: 13 }" or "retryDelay": "13s".
+    match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error))
+    if not match:
+        match = re.search(r'retryDelay"?\s*:\s*"?(\d+(?:\.\d+)?)s', str(error))
+    return float(match.group(1)) if match else None
+
+def is_invalid_key(error):
+    text = str(error)
+    return "API key expired" in text or "API_KEY_INVALID" in text or "API key not valid" in text
+
+class RouteHealth:
+    def __init__(self):
+        self.latency = None  # EWMA of successful request time, None until the route has been tried
+        self.failures = 0    # consecutive non-429 failures
+        self.throttled = []  # times of recent 429s
+        self.open_until = 0.0
+        self.in_flight = 0
+        self.disabled = False
+        self.last_error = None
+
+    def usable(self, now):
+        return not self.disabled and now >= self.open_until
+
+    def cost(self, now):
+        # Untried routes cost nothing, so every key and model gets sampled early on.
+        self.throttled = [t for t in self.throttled if now - t < THROTTLE_WINDOW]
+        return (self.latency or 0.0) * (1 + self.in_flight) * (1 + len(self.throttled)) + self.in_flight
+
+# Shared by every router in the process, so what one batch learns about a key protects the next.
+_health = {}
+_health_lock = threading.Lock()
+
+def _route_health(route):
+    if route not in _health:
+        _health[route] = RouteHealth()
+    return _health[route]
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+class ModelRouter:
+    def __init__(self, api_keys, model_names):
+        self.keys = split_options(api_keys)
+        self.models = split_options(model_names)
+
+    def _acquire(self):
+        # Models are tried in the given order; within a model the cheapest usable key wins.
+        # Returns (route, None), or (None, seconds until a route reopens / None if none ever will).
+        now = time.monotonic()
+        with _health_lock:
+            for model in self.models:
+                usable = [(key, model) for key in self.keys if _route_health((key, model)).usable(now)]
+                if usable:
+                    route = min(usable, key=lambda r: _health[r].cost(now))
+                    _health[route].in_flight += 1
+                    return route, None
+            waits = [_health[(key, model)].open_until - now for model in self.models for key in self.keys
+                     if not _health[(key, model)].disabled]
+        return None, (max(0.0, min(waits)) if waits else None)
+
+    def _release(self, route, error=None, latency=None):
+        now = time.monotonic()
+        with _health_lock:
+            health = _health[route]
+            health.in_flight -= 1
+            if error is not None:
+                health.last_error = error
+            if error is None:
+                health.failures = 0
+                if latency is not None:
+                    health.latency = latency if health.latency is None else \
+                        (1 - LATENCY_ALPHA) * health.latency + LATENCY_ALPHA * latency
+            elif isinstance(error, ResourceExhausted):
+                health.throttled.append(now)
+                health.open_until = max(health.open_until, now + (retry_delay_hint(error) or THROTTLE_COOLDOWN))
+            elif is_invalid_key(error):
+                for (key, _), other in _health.items():
+                    if key == route[0]:
+                        other.disabled = True
+                        other.last_error = error
+            elif isinstance(error, (NotFound, PermissionDenied)):
+                health.disabled = True
+            else:
+                health.failures += 1
+                if health.failures >= FAILURE_THRESHOLD:
+                    health.open_until = now + FAILURE_COOLDOWN
+
+    def _last_error(self):
+        # Why the routes are out of service, when this call has not tried any of them itself.
+        with _health_lock:
+            errors = [_health[(key, model)].last_error for model in self.models for key in self.keys]
+        return next((e for e in errors if e is not None), None)
+
+    def call(self, fn, max_rounds=3):
+        # Runs fn(key, model) on the best route and returns (result, route). A route-level failure moves on to
+        # the next route at once; when every route is cooling down it waits for the first one to reopen,
+        # at most max_rounds times, and then re-raises the last error. A wait longer than MAX_WAIT (a spent
+        # daily quota) is raised at once rather than slept through.
+        rounds = 0
+        last_error = None
+        while True:
+            route, wait = self._acquire()
+            if route is None:
+                rounds += 1
+                if wait is None or wait > MAX_WAIT or rounds > max_rounds:
+                    raise last_error or self._last_error() or RuntimeError("No usable API key and model.")
+                print(f"[Retry {rounds}] Every key/model is rate limited or failing. Waiting for {wait:.0f} seconds...")
+                metrics.observe("router_wait_seconds", wait)
+                time.sleep(wait)
+                continue
+
+            start = time.monotonic()
+            try:
+                result = fn(*route)
+            except Exception as e:
+                if isinstance(e, ROUTE_ERRORS) or is_invalid_key(e):
+                    metrics.inc("router_failovers_total", model=route[1], error=type(e).__name__)
+                    self._release(route, e)
+                    last_error = e
+                    continue
+                self._release(route)
+                raise
+            self._release(route, latency=time.monotonic() - start)
+            return result, route
+
+    def stream(self, fn, max_rounds=3):
+        # Like call for generators: a route can still fail over until it has produced its first chunk.
+        def first_chunk(key, model):
+            chunks = fn(key, model)
+            return next(chunks, None), chunks
+
+        (first, chunks), _ = self.call(first_chunk, max_rounds)
+        if first is not None:
+            yield first
+        yield from chunks
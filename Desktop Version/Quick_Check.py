@@ -1,41 +1,14 @@
 import tkinter as tk
-from tkinter import filedialog, ttk, messagebox, scrolledtext
-from PIL import Image, ImageTk
-import fitz  # PyMuPDF
-import docx
-import os
-import pyperclip
-import google.generativeai as genai
-
-# File text extractors
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    return "\n".join([page.get_text() for page in doc])
-
-def extract_text_from_docx(docx_path):
-    doc = docx.Document(docx_path)
-    return "\n".join([para.text for para in doc.paragraphs])
-
-def extract_text_from_file(file_path):
-    if not os.path.exists(file_path):
-        return f"Error: File not found at '{file_path}'"
-    _, ext = os.path.splitext(file_path)
-    try:
-        if ext.lower() == ".pdf":
-            return extract_text_from_pdf(file_path)
-        elif ext.lower() == ".docx":
-            return extract_text_from_docx(file_path)
-        elif ext.lower() == ".txt":
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            return f"Error: Unsupported file format '{ext}'"
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def analyze_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, model_name):
-    genai.configure(api_key=api_key)
-    prompt = f"""
+from tkinter import filedialog, ttk, messagebox
+from Gemini_Client import stream_text
+from Text_Extractor import extract_text_from_file
+from Text_Normalizer import normalize_text, format_report
+from Stats_Panel import show_stats_panel
+from Stream_Window import show_stream_result
+from Model_Analyzer import show_efficiency_window
+
+def build_analysis_prompt(resume_text, job_desc_text, code_type, pages):
+    return f"""
     Analyze the provided resume and job description thoroughly. Perform the following tasks:  
 
     **Match Analysis:**  
@@ -70,9 +43,10 @@ def analyze_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type
     **Suggested Resume Template**: Direct Link 
     **Generated Resume Code**: (Fully formatted and ready to use)
     """
-    model = genai.GenerativeModel("models/" + model_name)
-    response = model.generate_content(prompt)
-    return response.text
+
+def stream_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, model_name):
+    prompt = build_analysis_prompt(resume_text, job_desc_text, code_type, pages)
+    return stream_text(prompt, api_key, model_name)
 
 def main():
     def upload_resume():
@@ -85,53 +59,8 @@ def main():
         job_desc_entry.delete(0, tk.END)
         job_desc_entry.insert(0, path)
 
-    def display_result(text, model_name):
-        result_window = tk.Toplevel(root)
-        result_window.title("Analysis Result")
-        result_window.geometry("800x600")
-
-        model_label = tk.Label(result_window, text=f"Results from Gemini Model: {model_name}", fg="blue", font=("Arial", 10, "italic"))
-        model_label.pack(pady=5)
-
-        text_box = scrolledtext.ScrolledText(result_window, wrap=tk.WORD, font=("Arial", 10))
-        text_box.insert(tk.END, text)
-        text_box.pack(expand=True, fill="both")
-
-        def show_code():
-            code_window = tk.Toplevel(result_window)
-            code_window.title("Generated Resume Code")
-            code_window.geometry("800x600")
-            code_box = scrolledtext.ScrolledText(code_window, wrap=tk.WORD, font=("Courier", 10))
-
-            start = text.lower().find("generated resume code")
-            if start != -1:
-                code = text[start:].split("\n", 1)[-1].strip()
-            else:
-                code = "No code found"
-            code_box.insert(tk.END, code)
-            code_box.pack(expand=True, fill="both")
-
-            def copy_code():
-                pyperclip.copy(code)
-                messagebox.showinfo("Copied", "Code copied to clipboard!")
-
-            copy_btn = tk.Button(code_window, text="Copy Code", command=copy_code)
-            copy_btn.pack(pady=5)
-
-        tk.Button(result_window, text="Show Resume Code", command=show_code).pack(pady=5)
-
-    def show_model_efficiency():
-        try:
-            img_win = tk.Toplevel(root)
-            img_win.title("Model Efficiencies")
-            img = Image.open("C:/Users/user/Desktop/FYP Backup/FYP Pre final/model_efficiency_graph.png")
-            img = img.resize((750, 500), Image.Resampling.LANCZOS)
-            tk_img = ImageTk.PhotoImage(img)
-            panel = tk.Label(img_win, image=tk_img)
-            panel.image = tk_img
-            panel.pack()
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not load image: {str(e)}")
+    def display_result(chunks, model_name):
+        show_stream_result(root, "Analysis Result", f"Results from Gemini Model: {model_name}", chunks, "quick_check")
 
     def analyze():
         api_key = api_entry.get()
@@ -145,12 +74,14 @@ def main():
             messagebox.showerror("Input Error", "Please fill in all fields.")
             return
 
-        resume_text = extract_text_from_file(resume_path)
-        job_desc_text = extract_text_from_file(job_desc_path)
+        report = {}
+        resume_text = normalize_text(extract_text_from_file(resume_path), report=report)
+        job_desc_text = normalize_text(extract_text_from_file(job_desc_path), report=report)
+        print(format_report(report))
 
         try:
-            result = analyze_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, model_name)
-            display_result(result, model_name)
+            chunks = stream_resume_with_google_ai(resume_text, job_desc_text, api_key, code_type, pages, model_name)
+            display_result(chunks, model_name)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -158,7 +89,7 @@ def main():
     root.title("FrResAlyzer - Quick Check")
     root.geometry("700x540")
 
-    tk.Label(root, text="Google API Key:").pack()
+    tk.Label(root, text="Google API Key(s), comma-separated:").pack()
     api_entry = tk.Entry(root, width=60, show='*')
     api_entry.pack()
 
@@ -180,7 +111,7 @@ def main():
     pages_var = ttk.Combobox(root, values=["one", "multi"])
     pages_var.pack()
 
-    tk.Label(root, text="Note: If you encounter errors (429, expired/invalid API key), try using a different model.",
+    tk.Label(root, text="Note: Rate-limited (429) or invalid keys are skipped when several are given. If every key fails, try using a different model.",
              fg="red", wraplength=600, justify="left").pack(pady=5)
 
     # Model dropdown and button side by side
@@ -198,9 +129,12 @@ def main():
     model_var.set("gemini-1.5-flash-latest")
     model_var.pack(side="left", padx=5)
 
-    tk.Button(model_frame, text="Show Model's Efficiencies", command=show_model_efficiency).pack(side="left")
+    tk.Button(model_frame, text="Show Model's Efficiencies", command=lambda: show_efficiency_window(root)).pack(side="left")
 
-    tk.Button(root, text="Analyze", command=analyze, bg="green", fg="white", width=20).pack(pady=10)
+    action_frame = tk.Frame(root)
+    action_frame.pack(pady=10)
+    tk.Button(action_frame, text="Analyze", command=analyze, bg="green", fg="white", width=20).pack(side="left", padx=5)
+    tk.Button(action_frame, text="Show Stats", command=lambda: show_stats_panel(root, "quick_check")).pack(side="left", padx=5)
 
     root.mainloop()
 
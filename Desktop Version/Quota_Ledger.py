@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from google.api_core.exceptions import ResourceExhausted
+from Disk_Cache import CACHE_DIR
+
+# Free-tier limits as (requests/min, tokens/min, requests/day); the first matching prefix wins.
+# A paid key can override them with {"model-prefix": [rpm, tpm, rpd]} in ~/.fresalyzer/quota_limits.json,
+# and requests/min and tokens/min entered in Recruiter Mode or the CLI replace them for that run.
+MODEL_LIMITS = [
+    ("gemini-2.5-pro", (5, 250000, 25)),
+    ("gemini-2.5-flash", (10, 250000, 500)),
+    ("gemini-2.0-pro", (2, 1000000, 50)),
+    ("gemini-2.0-flash-lite", (30, 1000000, 1500)),
+    ("gemini-2.0-flash-thinking", (10, 4000000, 1500)),
+    ("gemini-2.0-flash", (15, 1000000, 1500)),
+    ("gemini-1.5-pro", (2, 32000, 50)),
+    ("gemini-1.5-flash", (15, 1000000, 1500)),
+]
+DEFAULT_LIMITS = (15, 1000000, 1500)
+LIMITS_FILE = os.path.join(CACHE_DIR, "quota_limits.json")
+
+MINUTE = 60
+DAY = 24 * 3600
+
+# Longer waits (a spent daily quota) are raised as a 429 instead, so Model_Router moves on to another key or model.
+MAX_WAIT = MINUTE
+
+def key_hash(api_key):
+    # Only a fingerprint of the key is written to disk.
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+def short_model_name(model_name):
+    return model_name[len("models/"):] if model_name.startswith("models/") else model_name
+
+def load_limits(path=LIMITS_FILE):
+    limits = list(MODEL_LIMITS)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        limits = [(prefix, tuple(values)) for prefix, values in overrides.items()] + limits
+    except (OSError, ValueError, TypeError) as e:
+        if os.path.exists(path):
+            print(f"Ignoring {path}: {e}")
+    # Longest prefix first, so "gemini-2.0-flash-lite" is not matched as "gemini-2.0-flash".
+    return sorted(limits, key=lambda item: len(item[0]), reverse=True)
+
+class QuotaLedger:
+    # Every request from every FrResAlyzer process (the separately launched modes and the Streamlit backend)
+    # is written here before it is sent. A request only goes out once it fits the sliding one-minute and
+    # one-day windows for its (key, model), so running several modes at once queues instead of 429ing.
+    def __init__(self, path=os.path.join(CACHE_DIR, "quota_ledger.sqlite3"), limits=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.limits = limits if limits is not None else load_limits()
+        self.configured = {}  # model -> (rpm, tpm) entered by the user in this process
+        self._lock = threading.Lock()
+        # Autocommit mode; reserve() opens its own BEGIN IMMEDIATE transaction, which also locks out other processes.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            "id INTEGER PRIMARY KEY, key_hash TEXT NOT NULL, model TEXT NOT NULL, "
+            "ts REAL NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_route ON requests(key_hash, model, ts)")
+
+    def _matching(self, name):
+        return next(((prefix, limits) for prefix, limits in self.limits if name.startswith(prefix)), None)
+
+    def configure(self, model_name, rpm=None, tpm=None):
+        # Entered limits replace requests/min and tokens/min for the model; None for both goes back to the
+        # file or free-tier ones. Requests/day always come from those.
+        name = short_model_name(model_name)
+        with self._lock:
+            if rpm is None and tpm is None:
+                self.configured.pop(name, None)
+            else:
+                self.configured[name] = (rpm, tpm)
+
+    def limits_for(self, model_name):
+        name = short_model_name(model_name)
+        entry = self._matching(name)
+        limits = entry[1] if entry else DEFAULT_LIMITS
+        if name in self.configured:
+            rpm, tpm = self.configured[name]
+            limits = (rpm or limits[0], tpm or limits[1], limits[2])
+        return limits
+
+    def describe(self, model_name):
+        # Which limits are in force for a model and where they come from, for the UI and the CLI.
+        name = short_model_name(model_name)
+        entry = self._matching(name)
+        if name in self.configured:
+            source = "entered"
+        elif entry is None or entry in MODEL_LIMITS:
+            source = "free-tier default"
+        else:
+            source = os.path.basename(LIMITS_FILE)
+        rpm, tpm, rpd = self.limits_for(name)
+        return f"{name}: {rpm} requests/min, {tpm} tokens/min, {rpd} requests/day ({source})"
+
+    def _window(self, key, model, now):
+        return self._conn.execute(
+            "SELECT ts, tokens FROM requests WHERE key_hash = ? AND model = ? AND ts > ? ORDER BY ts",
+            (key, model, now - DAY)
+        ).fetchall()
+
+    def _wait_time(self, rows, tokens, limits, now):
+        # Seconds until one more request of `tokens` fits every window; 0 when it fits now.
+        rpm, tpm, rpd = limits
+        wait = 0.0
+        if len(rows) >= rpd:
+            wait = max(wait, rows[len(rows) - rpd][0] + DAY - now)
+        recent = [row for row in rows if row[0] > now - MINUTE]
+        if len(recent) >= rpm:
+            wait = max(wait, recent[len(recent) - rpm][0] + MINUTE - now)
+        used = sum(t for _, t in recent)
+        for ts, t in recent:
+            if used + tokens <= tpm:
+                break
+            used -= t
+            wait = max(wait, ts + MINUTE - now)
+        return wait
+
+    def reserve(self, api_key, model_name, tokens, cancelled=None):
+        # Blocks until the request fits, records it and returns its id for settle().
+        # Returns None without booking anything if the `cancelled` event is set while it waits.
+        model = short_model_name(model_name)
+        key = key_hash(api_key)
+        limits = self.limits_for(model)
+        # A single request bigger than the whole minute budget can still go through once the window is empty.
+        tokens = min(tokens, limits[1])
+        while True:
+            with self._lock:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute("DELETE FROM requests WHERE ts <= ?", (now - DAY,))
+                    wait = self._wait_time(self._window(key, model, now), tokens, limits, now)
+                    row_id = None
+                    if wait <= 0:
+                        row_id = self._conn.execute(
+                            "INSERT INTO requests (key_hash, model, ts, tokens) VALUES (?, ?, ?, ?)",
+                            (key, model, now, tokens)
+                        ).lastrowid
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            if row_id is not None:
+                return row_id
+            if wait > MAX_WAIT:
+                raise ResourceExhausted(f"Local quota ledger: {model} has used its daily requests on this key. "
+                                        f"retry_delay {{ seconds: {int(wait) + 1} }}")
+            if cancelled is None:
+                time.sleep(wait)
+            elif cancelled.wait(wait):
+                return None
+
+    def release(self, row_id):
+        # Gives a booked request back when it was never sent.
+        with self._lock:
+            self._conn.execute("DELETE FROM requests WHERE id = ?", (row_id,))
+
+    def settle(self, row_id, tokens):
+        # Replaces the estimate with the token count Gemini reported.
+        with self._lock:
+            self._conn.execute("UPDATE requests SET tokens = ? WHERE id = ?", (tokens, row_id))
+
+    def usage(self, api_key, model_name):
+        model = short_model_name(model_name)
+        now = time.time()
+        with self._lock:
+            rows = self._window(key_hash(api_key), model, now)
+        recent = [row for row in rows if row[0] > now - MINUTE]
+        rpm, tpm, rpd = self.limits_for(model)
+        return {"requests_per_min": (len(recent), rpm), "tokens_per_min": (sum(t for _, t in recent), tpm),
+                "requests_per_day": (len(rows), rpd)}
@@ -1,119 +1,137 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox, scrolledtext
 import os
-import fitz  # PyMuPDF
-import docx
-import google.generativeai as genai
-import re
-import time
+import queue
+import threading
 import pandas as pd
 import matplotlib.pyplot as plt
-from PIL import Image, ImageTk
-from google.api_core.exceptions import ResourceExhausted
-
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = "\n".join([page.get_text() for page in doc])
-    return text
-
-def extract_text_from_docx(docx_path):
-    doc = docx.Document(docx_path)
-    text = "\n".join([para.text for para in doc.paragraphs])
-    return text
-
-def extract_text_from_file(file_path):
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower()
-    try:
-        if ext == ".pdf":
-            return extract_text_from_pdf(file_path)
-        elif ext == ".docx":
-            return extract_text_from_docx(file_path)
-        elif ext == ".txt":
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            return f"Error: Unsupported file format '{ext}'."
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
-
-def extract_candidate_name(text):
-    name_match = re.search(r'(?i)\*\*Candidate Name\*\*\s*[:\-\u2013]?\s*(.+)', text)
-    if name_match:
-        return name_match.group(1).strip().split('\n')[0]
-    return "Unknown"
-
-def analyze_with_google_ai(resume_text, job_desc_text, api_key, model_name, max_retries=3):
-    genai.configure(api_key=api_key)
-
-    prompt = f"""
-    Compare the following resume with the given job description and perform:
-    - Calculate **Match Percentage** between resume and job description.
-    - Extract **Candidate Name**.
-
-    Provide response in this format:
-    **Candidate Name**: John Doe
-    **Match Percentage**: 85%
-    Give only the above information. Don't give any details.
-    Resume:
-    {resume_text}
-
-    Job Description:
-    {job_desc_text}
-    """
-
-    # - If the job description mentions that the job requires work experience i.e, required work experience > 0 years or > 0 months, then return the Match percentage as 0%
-    
-    model = genai.GenerativeModel(f"models/{model_name}")
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except ResourceExhausted as e:
-            wait_time = 60 if attempt == max_retries else 15 * attempt
-            print(f"[Retry {attempt}] Quota exhausted. Waiting for {wait_time} seconds...")
-            time.sleep(wait_time)
-        except Exception as e:
-            if "API key expired" in str(e) or "API_KEY_INVALID" in str(e):
-                messagebox.showerror("API Key Error", "Your Google API key is invalid or expired. Please renew it.")
-                return "Error: Invalid API key."
-            print(f"Error during AI analysis: {e}")
-            return "Error during AI analysis."
-    return "Quota exhausted after retries."
-
-def display_shortlisted_only(results, top_n, selected_model_name):
-    sorted_results = sorted(results, key=lambda x: x[1], reverse=True)
-    top_results = sorted_results[:top_n]
-
-    shortlist_win = tk.Toplevel()
-    shortlist_win.title(f"Shortlisted Candidates - Gemini Model: {selected_model_name}")
-    shortlist_win.geometry("800x500")
-
-    text_box = scrolledtext.ScrolledText(shortlist_win, wrap=tk.WORD)
-    summary_text = f"Results generated using Gemini Model: {selected_model_name}\n\n"
-    text_box.insert(tk.END, summary_text)
-    for name, percent, _ in top_results:
-        line = f"{name}: {percent}%\n"
-        text_box.insert(tk.END, line)
-        summary_text += line
-    text_box.pack(expand=True, fill="both")
-
-    def copy_to_clipboard():
-        shortlist_win.clipboard_clear()
-        shortlist_win.clipboard_append(summary_text)
-        shortlist_win.update()
-        messagebox.showinfo("Copied", "Shortlist copied to clipboard!")
-
-    def export_results():
+from Text_Extractor import extract_text_from_file, extract_texts_parallel, format_page_report
+from Text_Normalizer import normalize_text, format_report, DEFAULT_TOKEN_BUDGET
+from Gemini_Client import cache_stats, quota_ledger
+from Metrics import metrics, save_run
+from Stats_Panel import show_stats_panel
+from Model_Analyzer import show_efficiency_window
+from JD_Profile import get_jd_profile
+from Lexical_Ranker import bm25_scores, rank_top_k, to_percentages
+from Results_Store import ResultsStore, checkpoint
+from Shortlist import Shortlist
+from Scoring_Engine import (TokenBucket, score_resumes, score_resumes_batched, score_resumes_cascade, rate_limits,
+                            DEFAULT_WORKERS, HEDGE_PERCENTILE, CASCADE_MODEL, CASCADE_BAND)
+
+class ShortlistWindow:
+    # Opens before the first score exists and keeps the top N up to date as scores arrive.
+    # Scoring threads only call expect/add/finish, which go through a queue that the Tk side drains with after().
+    def __init__(self, top_n, selected_model_name, rescorable=False):
+        self.top_n = top_n
+        self.selected_model_name = selected_model_name
+        self.shortlist = Shortlist(top_n, rescorable)
+        self.seen = set()
+        self.expected = 0
+        self.running = 0
+        self.summary_text = ""
+        self.updates = queue.Queue()
+
+        self.win = tk.Toplevel()
+        self.win.title(f"Shortlisted Candidates - Gemini Model: {selected_model_name}")
+        self.win.geometry("800x500")
+
+        self.status_label = tk.Label(self.win, anchor="w")
+        self.status_label.pack(fill="x", padx=5)
+        self.text_box = scrolledtext.ScrolledText(self.win, wrap=tk.WORD)
+        self.text_box.pack(expand=True, fill="both")
+
+        button_frame = tk.Frame(self.win)
+        button_frame.pack(pady=10)
+
+        tk.Button(button_frame, text="Copy to Clipboard", command=self.copy_to_clipboard).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Export to CSV/Excel", command=self.export_results).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Show Bar Graph", command=self.show_bar_graph).pack(side=tk.LEFT, padx=5)
+
+        self.redraw()
+        self.win.after(200, self.poll)
+
+    def exists(self):
+        return bool(self.win.winfo_exists())
+
+    # Main thread only.
+    def start(self, paths):
+        self.seen.update(paths)
+        self.running += 1
+
+    # Safe to call from any thread.
+    def expect(self, count):
+        self.updates.put(("expect", count))
+
+    def add(self, key, result):
+        self.updates.put(("result", key, result))
+
+    def rescore(self, key, result):
+        self.updates.put(("rescore", key, result))
+
+    def finish(self, failures):
+        self.updates.put(("done", failures))
+
+    def poll(self):
+        if not self.exists():
+            return
+        changed = False
+        while True:
+            try:
+                update = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if update[0] == "expect":
+                self.expected += update[1]
+            elif update[0] == "result":
+                self.shortlist.add(update[1], update[2])
+            elif update[0] == "rescore":
+                self.shortlist.replace(update[1], update[2])
+            else:
+                self.running -= 1
+                self.report_failures(update[1])
+        if changed:
+            with metrics.timer("ui_render_seconds", mode="recruiter"):
+                self.redraw()
+        self.win.after(200, self.poll)
+
+    def redraw(self):
+        state = "scoring..." if self.running else "done"
+        self.status_label.config(text=f"Scored {self.shortlist.count} of {self.expected} resume(s), {state}")
+        # The label names the models that actually answered, which differ from the selected one after a
+        # failover or a hedged request; each line is tagged when more than one model is involved.
+        results = self.shortlist.results()
+        answered = sorted({model for _, _, _, model in results if model})
+        self.summary_text = f"Results generated using Gemini Model: {', '.join(answered) or self.selected_model_name}\n\n"
+        for name, percent, _, model in results:
+            self.summary_text += f"{name}: {percent}%" + (f" ({model})" if len(answered) > 1 else "") + "\n"
+        self.text_box.delete("1.0", tk.END)
+        self.text_box.insert(tk.END, self.summary_text)
+
+    def report_failures(self, failures):
+        # Failed resumes leave the session, so analyzing again retries them.
+        self.seen.difference_update(path for path, _ in failures)
+        if any("Invalid API key" in err for _, err in failures):
+            messagebox.showerror("API Key Error", "Your Google API key is invalid or expired. Please renew it.", parent=self.win)
+        elif failures:
+            failed = "\n".join(f"{os.path.basename(path)}: {err}" for path, err in failures)
+            messagebox.showwarning("Some Resumes Failed", f"{len(failures)} resume(s) could not be scored:\n{failed}", parent=self.win)
+
+    def copy_to_clipboard(self):
+        self.win.clipboard_clear()
+        self.win.clipboard_append(self.summary_text)
+        self.win.update()
+        messagebox.showinfo("Copied", "Shortlist copied to clipboard!", parent=self.win)
+
+    def export_results(self):
         export_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx")]
         )
         if export_path:
             try:
-                df = pd.DataFrame([(name, percent) for name, percent, _ in top_results],
-                                  columns=["Candidate Name", "Match Percentage"])
+                df = pd.DataFrame([(name, percent, model) for name, percent, _, model in self.shortlist.results()],
+                                  columns=["Candidate Name", "Match Percentage", "Model"])
                 if export_path.endswith(".csv"):
                     df.to_csv(export_path, index=False)
                 elif export_path.endswith(".xlsx"):
@@ -125,9 +143,10 @@ def display_shortlisted_only(results, top_n, selected_model_name):
             except Exception as e:
                 messagebox.showerror("Export Error", f"An error occurred:\n{str(e)}")
 
-    def show_bar_graph():
-        names = [name for name, _, _ in results]
-        percentages = [percent for _, percent, _ in results]
+    def show_bar_graph(self):
+        results = self.shortlist.results()
+        names = [name for name, _, _, _ in results]
+        percentages = [percent for _, percent, _, _ in results]
         plt.figure(figsize=(10, 6))
         plt.bar(names, percentages, color='skyblue')
         plt.xlabel("Candidates")
@@ -137,13 +156,6 @@ def display_shortlisted_only(results, top_n, selected_model_name):
         plt.tight_layout()
         plt.show()
 
-    button_frame = tk.Frame(shortlist_win)
-    button_frame.pack(pady=10)
-
-    tk.Button(button_frame, text="Copy to Clipboard", command=copy_to_clipboard).pack(side=tk.LEFT, padx=5)
-    tk.Button(button_frame, text="Export to CSV/Excel", command=export_results).pack(side=tk.LEFT, padx=5)
-    tk.Button(button_frame, text="Show Bar Graph", command=show_bar_graph).pack(side=tk.LEFT, padx=5)
-
 def main():
     resume_paths = []
 
@@ -158,20 +170,6 @@ def main():
         resume_paths = paths
         resume_label.config(text=f"{len(paths)} Resume(s) Selected")
 
-    def show_efficiency_image():
-        img_path = "./model_efficiency_graph.png"  # Replace with your actual image path
-        if os.path.exists(img_path):
-            img_win = tk.Toplevel()
-            img_win.title("Model Efficiency Graph")
-            img = Image.open(img_path)
-            img = img.resize((800, 500), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            label = tk.Label(img_win, image=photo)
-            label.image = photo
-            label.pack()
-        else:
-            messagebox.showerror("File Not Found", f"Image not found at: {img_path}")
-
     def analyze():
         api_key = api_entry.get()
         job_path = job_desc_entry.get()
@@ -181,33 +179,156 @@ def main():
             messagebox.showerror("Input Error", "Please enter a valid number for top N candidates.")
             return
 
-        if not all([api_key, job_path, resume_paths]):
+        fast_mode = fast_mode_var.get()
+        if not all([job_path, resume_paths]) or not (api_key or fast_mode):
             messagebox.showerror("Input Error", "Please fill all fields and upload necessary files.")
             return
 
+        try:
+            # Blank rate limits mean the model's limits in the quota ledger.
+            rpm = int(rpm_entry.get()) if rpm_entry.get().strip() else None
+            tpm = int(tpm_entry.get()) if tpm_entry.get().strip() else None
+            workers = int(workers_entry.get())
+            prerank_factor = int(prerank_entry.get())
+            batch_budget = int(batch_entry.get())
+            doc_budget = int(doc_budget_entry.get())
+            hedge_percentile = float(hedge_percentile_entry.get()) / 100
+            cascade_band = float(cascade_band_entry.get())
+        except:
+            messagebox.showerror("Input Error", "Please enter valid numbers for the rate limits, workers, pre-rank factor, token budgets, hedge percentile and cascade band.")
+            return
+        if (rpm is not None and rpm <= 0) or (tpm is not None and tpm <= 0):
+            messagebox.showerror("Input Error", "Requests/min and tokens/min must be greater than 0 (or blank for the model's limits).")
+            return
+
         selected_model_name = model_var.get()
-        job_text = extract_text_from_file(job_path)
-        match_results = []
-
-        for res_path in resume_paths:
-            res_text = extract_text_from_file(res_path)
-            response_text = analyze_with_google_ai(res_text, job_text, api_key, selected_model_name)
-            rt = list(response_text)
-            pct = rt[-4] + rt[-3]
-            if rt[-5].isnumeric():
-                pct = rt[-5] + pct
-            percentage = float(pct)
-            candidate_name = extract_candidate_name(response_text)
-            match_results.append((candidate_name, percentage, response_text))
-            time.sleep(5)
-
-        display_shortlisted_only(match_results, top_n, selected_model_name)
+        # Model_Router takes comma-separated models in order of preference and falls back down the list.
+        model_name = selected_model_name
+        if failover_var.get():
+            model_name = ",".join([selected_model_name] + [m for m in model_choices if m != selected_model_name])
+        # A request slower than the hedge percentile of the model's recent latency is also sent to the hedge model.
+        hedge_model = hedge_model_var.get() if hedge_var.get() and hedge_model_var.get() != selected_model_name else None
+        # Cascade: the cheap model scores everyone and the selected model only re-scores the close calls.
+        cheap_model = cascade_model_var.get() if cascade_var.get() and cascade_model_var.get() != selected_model_name else None
+        use_jd_profile = jd_profile_var.get()
+        reuse_saved = reuse_var.get()
+        if not fast_mode:
+            rpm, tpm = rate_limits(",".join(filter(None, [model_name, hedge_model, cheap_model])), rpm, tpm)
+            show_limits()
+
+        # Analyzing the same JD and model again while its shortlist is open only scores the newly added resumes.
+        session_key = (job_path, model_name, top_n, cheap_model and (cheap_model, cascade_band))
+        window = None if fast_mode else sessions.get(session_key)
+        if window is None or not window.exists():
+            window = ShortlistWindow(top_n, "None (local BM25 fast mode)" if fast_mode else selected_model_name,
+                                     rescorable=bool(cheap_model))
+            if not fast_mode:
+                sessions[session_key] = window
+        new_paths = [path for path in resume_paths if path not in window.seen]
+        window.win.lift()
+        if not new_paths:
+            messagebox.showinfo("Nothing New", "Every selected resume is already in this shortlist.", parent=window.win)
+            return
+        window.start(new_paths)
+
+        def work():
+            failures = []
+            scored = set()
+
+            def publish(path, result):
+                scored.add(path)
+                window.add(path, result)
+
+            try:
+                report = {}
+                job_text = normalize_text(extract_text_from_file(job_path), doc_budget, report)
+                page_reports = {}
+                texts, extract_failures = extract_texts_parallel(new_paths, reports=page_reports)
+                for note in filter(None, (format_page_report(os.path.basename(path), r) for path, r in page_reports.items())):
+                    print(note)
+                resume_texts = {path: normalize_text(text, doc_budget, report) for path, text in zip(new_paths, texts) if text is not None}
+                print(format_report(report))
+                paths = [path for path in new_paths if path in resume_texts]
+                failures.extend(extract_failures)
+
+                if fast_mode:
+                    scores = bm25_scores(job_text, [resume_texts[path] for path in paths])
+                    window.expect(len(paths))
+                    for path, pct in zip(paths, to_percentages(scores)):
+                        publish(path, (os.path.basename(path), pct, "", None))
+                    return
+
+                # Only the best lexical matches are worth spending quota on.
+                if prerank_factor > 0:
+                    top_indices, _ = rank_top_k(job_text, [resume_texts[path] for path in paths], prerank_factor * top_n)
+                    paths = [paths[i] for i in top_indices]
+                window.expect(len(paths))
+
+                limiter = TokenBucket(rpm=rpm, tpm=tpm)
+                # Every per-resume prompt carries the compact profile instead of the full JD.
+                prompt_job_text = get_jd_profile(job_text, api_key, model_name, limiter) if use_jd_profile else job_text
+
+                # Every score is saved as it arrives; resumes already scored for this JD and model are not sent again.
+                def saved(model, model_paths):
+                    completed, remaining, record = checkpoint(results_store, prompt_job_text, model, model_paths, resume_texts)
+                    if not reuse_saved:
+                        return [], model_paths, record
+                    if completed:
+                        print(f"Reusing {len(completed)} saved {model} score(s); {len(remaining)} resume(s) left to score")
+                    return completed, remaining, record
+
+                if cheap_model:
+                    _, scoring_failures = score_resumes_cascade(paths, prompt_job_text, api_key, model_name,
+                                                                resume_texts.get, top_n, cheap_model, cascade_band,
+                                                                token_budget=batch_budget, max_workers=workers,
+                                                                limiter=limiter, on_result=publish,
+                                                                on_rescore=window.rescore, saved=saved,
+                                                                hedge_model=hedge_model, hedge_percentile=hedge_percentile,
+                                                                shortlist=window.shortlist)
+                else:
+                    completed, remaining, record = saved(model_name, paths)
+                    for path, result in completed:
+                        publish(path, result)
+
+                    def on_result(path, result):
+                        record(path, result)
+                        publish(path, result)
+
+                    if batch_budget > 0:
+                        _, scoring_failures = score_resumes_batched(remaining, prompt_job_text, api_key, model_name,
+                                                                    resume_texts.get, token_budget=batch_budget,
+                                                                    max_workers=workers, limiter=limiter, on_result=on_result,
+                                                                    hedge_model=hedge_model, hedge_percentile=hedge_percentile)
+                    else:
+                        _, scoring_failures = score_resumes(remaining, prompt_job_text, api_key, model_name,
+                                                            resume_texts.get, max_workers=workers, limiter=limiter,
+                                                            on_result=on_result, hedge_model=hedge_model,
+                                                            hedge_percentile=hedge_percentile)
+                failures.extend(scoring_failures)
+                stats = cache_stats()
+                print(f"Response cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+            except Exception as e:
+                print(f"Error during analysis: {e}")
+                failed = {path for path, _ in failures}
+                failures.extend((path, f"Error during analysis: {e}") for path in new_paths
+                                if path not in scored and path not in failed)
+            finally:
+                print(f"Run metrics saved to {save_run('recruiter')}")
+                window.finish(failures)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def show_limits(*_):
+        limits_label.config(text=f"Limits in force for {quota_ledger.describe(model_var.get())}")
+
+    results_store = ResultsStore()
+    sessions = {}
 
     root = tk.Tk()
     root.title("FrResAlyzer - Recruiter Mode")
-    root.geometry("800x600")
+    root.geometry("800x820")
 
-    tk.Label(root, text="Google API Key:").pack()
+    tk.Label(root, text="Google API Key(s), comma-separated:").pack()
     api_entry = tk.Entry(root, width=60, show='*')
     api_entry.pack()
 
@@ -225,9 +346,62 @@ def main():
     top_n_entry = tk.Entry(root, width=10)
     top_n_entry.pack()
 
+    rate_frame = tk.Frame(root)
+    rate_frame.pack(pady=(10, 0))
+
+    tk.Label(rate_frame, text="Requests/min:").pack(side=tk.LEFT, padx=2)
+    rpm_entry = tk.Entry(rate_frame, width=8)
+    rpm_entry.pack(side=tk.LEFT, padx=2)
+
+    tk.Label(rate_frame, text="Tokens/min:").pack(side=tk.LEFT, padx=2)
+    tpm_entry = tk.Entry(rate_frame, width=10)
+    tpm_entry.pack(side=tk.LEFT, padx=2)
+
+    tk.Label(rate_frame, text="Parallel Workers:").pack(side=tk.LEFT, padx=2)
+    workers_entry = tk.Entry(rate_frame, width=5)
+    workers_entry.insert(0, str(DEFAULT_WORKERS))
+    workers_entry.pack(side=tk.LEFT, padx=2)
+
+    # Blank rate fields use the model's free-tier (or quota_limits.json) limits; this shows which apply.
+    limits_label = tk.Label(root, text="")
+    limits_label.pack()
+
+    prerank_frame = tk.Frame(root)
+    prerank_frame.pack(pady=(5, 0))
+
+    tk.Label(prerank_frame, text="Pre-rank Factor (sends top factor x N to Gemini, 0 = all):").pack(side=tk.LEFT, padx=2)
+    prerank_entry = tk.Entry(prerank_frame, width=5)
+    prerank_entry.insert(0, "3")
+    prerank_entry.pack(side=tk.LEFT, padx=2)
+
+    fast_mode_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(prerank_frame, text="Fast Mode (local ranking only, no API calls)", variable=fast_mode_var).pack(side=tk.LEFT, padx=5)
+
+    batch_frame = tk.Frame(root)
+    batch_frame.pack(pady=(5, 0))
+
+    tk.Label(batch_frame, text="Batch Token Budget (0 = one resume per request):").pack(side=tk.LEFT, padx=2)
+    batch_entry = tk.Entry(batch_frame, width=8)
+    batch_entry.insert(0, "0")
+    batch_entry.pack(side=tk.LEFT, padx=2)
+
+    tk.Label(batch_frame, text="Max Tokens/Document:").pack(side=tk.LEFT, padx=2)
+    doc_budget_entry = tk.Entry(batch_frame, width=8)
+    doc_budget_entry.insert(0, str(DEFAULT_TOKEN_BUDGET))
+    doc_budget_entry.pack(side=tk.LEFT, padx=2)
+
+    jd_profile_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="Send a compact JD profile instead of the full job description", variable=jd_profile_var).pack()
+
+    reuse_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(root, text="Reuse scores saved by earlier (or interrupted) runs of this batch", variable=reuse_var).pack()
+
+    failover_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="Fail over to the other models when the selected one is rate limited or unavailable", variable=failover_var).pack()
+
     note_frame = tk.Frame(root)
     note_frame.pack(fill='x', padx=10, pady=(10, 5))
-    tk.Label(note_frame, text="Note: Please use different models if you face error-429 or API key expired or invalid.", fg="red", anchor="center", justify="center", wraplength=700).pack()
+    tk.Label(note_frame, text="Note: Several API keys spread the load; rate-limited (429) or invalid keys are skipped automatically. Enable failover or pick a different model if every key keeps failing.", fg="red", anchor="center", justify="center", wraplength=700).pack()
 
     model_frame = tk.Frame(root)
     model_frame.pack(pady=10)
@@ -252,12 +426,42 @@ def main():
         "gemini-2.0-pro-exp"
     ]
     model_var.set(model_choices[0])
+    model_var.trace_add("write", show_limits)
+    show_limits()
     model_dropdown = ttk.Combobox(model_frame, textvariable=model_var, values=model_choices, width=40)
     model_dropdown.pack(side=tk.LEFT, padx=5)
 
-    tk.Button(model_frame, text="Show Model's Efficiencies", command=show_efficiency_image).pack(side=tk.LEFT, padx=5)
-
-    tk.Button(root, text="Analyze", command=analyze, bg="green", fg="white").pack(pady=10)
+    tk.Button(model_frame, text="Show Model's Efficiencies", command=lambda: show_efficiency_window(root)).pack(side=tk.LEFT, padx=5)
+
+    hedge_frame = tk.Frame(root)
+    hedge_frame.pack()
+
+    hedge_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(hedge_frame, text="Hedge slow requests with:", variable=hedge_var).pack(side=tk.LEFT, padx=2)
+    hedge_model_var = tk.StringVar(value="gemini-2.0-flash")
+    ttk.Combobox(hedge_frame, textvariable=hedge_model_var, values=model_choices, width=30).pack(side=tk.LEFT, padx=2)
+    tk.Label(hedge_frame, text="after latency percentile:").pack(side=tk.LEFT, padx=2)
+    hedge_percentile_entry = tk.Entry(hedge_frame, width=5)
+    hedge_percentile_entry.insert(0, f"{HEDGE_PERCENTILE * 100:g}")
+    hedge_percentile_entry.pack(side=tk.LEFT, padx=2)
+
+    cascade_frame = tk.Frame(root)
+    cascade_frame.pack()
+
+    cascade_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(cascade_frame, text="Cascade: score everyone with", variable=cascade_var).pack(side=tk.LEFT, padx=2)
+    cascade_model_var = tk.StringVar(value=CASCADE_MODEL)
+    ttk.Combobox(cascade_frame, textvariable=cascade_model_var, values=model_choices, width=30).pack(side=tk.LEFT, padx=2)
+    tk.Label(cascade_frame, text="then re-score within").pack(side=tk.LEFT, padx=2)
+    cascade_band_entry = tk.Entry(cascade_frame, width=5)
+    cascade_band_entry.insert(0, f"{CASCADE_BAND:g}")
+    cascade_band_entry.pack(side=tk.LEFT, padx=2)
+    tk.Label(cascade_frame, text="points of the cutoff").pack(side=tk.LEFT, padx=2)
+
+    action_frame = tk.Frame(root)
+    action_frame.pack(pady=10)
+    tk.Button(action_frame, text="Analyze", command=analyze, bg="green", fg="white").pack(side=tk.LEFT, padx=5)
+    tk.Button(action_frame, text="Show Stats", command=lambda: show_stats_panel(root, "recruiter")).pack(side=tk.LEFT, padx=5)
 
     root.mainloop()
 
@@ -0,0 +1,91 @@
+import json
+import re
+
+# Scoring calls ask Gemini for schema-constrained JSON; these go into generation_config.
+MATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "candidate_name": {"type": "string"},
+        "match_percentage": {"type": "number"},
+    },
+    "required": ["candidate_name", "match_percentage"],
+}
+
+SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {"match_percentage": {"type": "number"}},
+    "required": ["match_percentage"],
+}
+
+BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "resume_id": {"type": "string"},
+            "candidate_name": {"type": "string"},
+            "match_percentage": {"type": "number"},
+        },
+        "required": ["resume_id", "candidate_name", "match_percentage"],
+    },
+}
+
+PERCENT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+
+def json_config(schema):
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+def load_json(text, opener="{", closer="}"):
+    # Tolerates code fences or stray text around the JSON, which models without JSON mode still add.
+    start, end = text.find(opener), text.rfind(closer)
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+def validate_percentage(value):
+    # Accepts 85, 85.5, "85", "85.5%"; anything else, or anything outside 0-100, is None.
+    if isinstance(value, bool):
+        return None
+    try:
+        percentage = float(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+    return percentage if 0 <= percentage <= 100 else None
+
+def find_percentage(text):
+    # For free-form reports: the first "NN%" or "NN.N%" in the text, or None.
+    match = PERCENT_PATTERN.search(text)
+    return validate_percentage(match.group(1)) if match else None
+
+def validate_entry(entry):
+    # One scoring object -> (candidate_name, match_percentage), or None if any field is invalid.
+    if not isinstance(entry, dict):
+        return None
+    percentage = validate_percentage(entry.get("match_percentage"))
+    if percentage is None:
+        return None
+    name = entry.get("candidate_name")
+    name = name.strip() if isinstance(name, str) and name.strip() else "Unknown"
+    return name, percentage
+
+def parse_match(response_text):
+    # (candidate_name, match_percentage, raw) for a single-resume answer, or None so the caller can re-ask.
+    entry = validate_entry(load_json(response_text))
+    return (entry[0], entry[1], response_text) if entry else None
+
+def parse_batch(response_text, expected_ids):
+    # {resume_id: (candidate_name, match_percentage, raw)} for every valid entry; anything else is left out.
+    entries = load_json(response_text, "[", "]")
+    if not isinstance(entries, list):
+        return {}
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or str(entry.get("resume_id")) not in expected_ids:
+            continue
+        valid = validate_entry(entry)
+        if valid:
+            parsed[str(entry["resume_id"])] = (valid[0], valid[1], json.dumps(entry))
+    return parsed
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from Disk_Cache import CACHE_DIR
+
+def text_hash(text):
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+class ResultsStore:
+    # Every scored resume is committed the moment it arrives, so an interrupted batch only has to redo
+    # what had not finished. Rows are keyed by (JD, resume text, model), never by file path.
+    def __init__(self, path=os.path.join(CACHE_DIR, "results.sqlite3")):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "jd_hash TEXT NOT NULL, resume_hash TEXT NOT NULL, model TEXT NOT NULL, "
+            "file_name TEXT, candidate_name TEXT, score REAL NOT NULL, raw TEXT, created REAL NOT NULL, "
+            "UNIQUE (jd_hash, resume_hash, model))"
+        )
+        # Stores created before hedging and failover recorded which model actually answered.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if "answered_by" not in columns:
+            self._conn.execute("ALTER TABLE results ADD COLUMN answered_by TEXT")
+        # The UNIQUE constraint already indexes lookups by JD (and JD + model).
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_candidate ON results(candidate_name)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_model ON results(model)")
+        self._conn.commit()
+
+    def add(self, jd_hash, resume_hash, model, result, file_name=None):
+        candidate_name, score, raw, answered_by = result
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(jd_hash, resume_hash, model, file_name, candidate_name, score, raw, answered_by, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (jd_hash, resume_hash, model, file_name, candidate_name, score, raw, answered_by, time.time())
+            )
+            self._conn.commit()
+
+    def completed(self, jd_hash, model):
+        # {resume_hash: (candidate_name, score, raw, answered_by)} for everything already scored against this JD.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT resume_hash, candidate_name, score, raw, COALESCE(answered_by, model) FROM results "
+                "WHERE jd_hash = ? AND model = ?",
+                (jd_hash, model)
+            ).fetchall()
+        return {resume_hash: (name, score, raw, answered_by) for resume_hash, name, score, raw, answered_by in rows}
+
+def checkpoint(store, job_text, model_name, paths, resume_texts):
+    # Splits a batch into what the store already has and what still needs scoring.
+    # Returns (completed results, remaining paths, record) where record(path, result) saves a new score.
+    jd_key = text_hash(job_text)
+    resume_keys = {path: text_hash(resume_texts[path]) for path in paths}
+    done = store.completed(jd_key, model_name)
+    completed = [(path, done[resume_keys[path]]) for path in paths if resume_keys[path] in done]
+    remaining = [path for path in paths if resume_keys[path] not in done]
+
+    def record(path, result):
+        store.add(jd_key, resume_keys[path], model_name, result, os.path.basename(path))
+
+    return completed, remaining, record
@@ -0,0 +1,332 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google.api_core.exceptions import ResourceExhausted
+from Gemini_Client import generate_routed, generate_hedged, quota_ledger, HEDGE_PERCENTILE
+from Metrics import metrics
+from Model_Router import is_invalid_key, split_options
+from Quota_Ledger import short_model_name
+from Response_Parser import MATCH_SCHEMA, BATCH_SCHEMA, json_config, parse_match, parse_batch
+from Text_Normalizer import estimate_tokens
+
+# Used when a TokenBucket is made without limits; the modes take theirs from rate_limits().
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1000000
+DEFAULT_WORKERS = 4
+
+# Rough allowance for the short JSON "name + percentage" answer.
+RESPONSE_TOKENS = 50
+
+# Prompt size (JD + resumes) a single batched request may use.
+DEFAULT_BATCH_TOKEN_BUDGET = 24000
+MAX_BATCH_SIZE = 20
+
+# Cascade mode: the cheap model scores every resume, and the chosen model re-scores only the resumes within
+# CASCADE_BAND points of the top-N cutoff.
+CASCADE_MODEL = "gemini-1.5-flash-8b"
+CASCADE_BAND = 10
+
+class TokenBucket:
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens=1):
+        # A single request bigger than the whole minute budget can still go through once the bucket is full.
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max((1 - self._requests) * 60.0 / self.rpm,
+                           (tokens - self._tokens) * 60.0 / self.tpm)
+            metrics.observe("rate_limit_wait_seconds", wait)
+            time.sleep(wait)
+
+def rate_limits(model_names, rpm=None, tpm=None):
+    # Limits the user entered also go to the quota ledger, so it and the TokenBucket agree; with none entered,
+    # both use the ledger's limits. Returns the (rpm, tpm) in force for the first model.
+    models = split_options(model_names)
+    for model in models:
+        quota_ledger.configure(model, rpm, tpm)
+    return quota_ledger.limits_for(models[0])[:2]
+
+def build_match_prompt(resume_text, job_desc_text):
+    return f"""
+    Compare the following resume with the given job description and perform:
+    - Calculate the match percentage between the resume and the job description.
+    - Extract the candidate name.
+
+    Respond with only a JSON object and nothing else, for example:
+    {{"candidate_name": "John Doe", "match_percentage": 85}}
+
+    Resume:
+    {resume_text}
+
+    Job Description:
+    {job_desc_text}
+    """
+
+def generate_with_retries(prompt, api_key, model_name, max_retries=3, limiter=None,
+                          response_tokens=RESPONSE_TOKENS, use_cache=True, generation_config=None):
+    return generate_answer(prompt, api_key, model_name, max_retries, limiter, response_tokens, use_cache,
+                           generation_config)[0]
+
+def generate_answer(prompt, api_key, model_name, max_retries=3, limiter=None, response_tokens=RESPONSE_TOKENS,
+                    use_cache=True, generation_config=None, hedge_model=None, hedge_percentile=HEDGE_PERCENTILE,
+                    accept=None):
+    # (text, model that answered), or (error message, None). With a hedge_model, a request that is slower than
+    # hedge_percentile of the model's recent latency is raced against hedge_model (see Gemini_Client.generate_hedged).
+    def send(model, prompt):
+        if limiter:
+            limiter.acquire(estimate_tokens(prompt) + response_tokens)
+        return model.generate_content(prompt)
+
+    # Model_Router already fails over between keys/models and waits out 429s, up to max_retries rounds.
+    try:
+        if hedge_model:
+            text, answered_by = generate_hedged(prompt, api_key, model_name, hedge_model, generation_config,
+                                                use_cache=use_cache, send=send, max_rounds=max_retries,
+                                                hedge_percentile=hedge_percentile, accept=accept)
+        else:
+            text, answered_by = generate_routed(prompt, api_key, model_name, generation_config, use_cache=use_cache,
+                                                send=send, max_rounds=max_retries)
+        return text, short_model_name(answered_by)
+    except ResourceExhausted:
+        return "Quota exhausted after retries.", None
+    except Exception as e:
+        if is_invalid_key(e):
+            return "Error: Invalid API key.", None
+        print(f"Error during AI analysis: {e}")
+        return "Error during AI analysis.", None
+
+def score_resume(res_path, job_text, api_key, model_name, extract_fn, limiter=None, max_attempts=3,
+                 hedge_model=None, hedge_percentile=HEDGE_PERCENTILE):
+    # (candidate_name, match_percentage, raw, model that answered).
+    res_text = extract_fn(res_path)
+    for attempt in range(max_attempts):
+        # Only this resume is asked again when its answer fails validation; a retry must not be answered from the cache.
+        response_text, answered_by = generate_answer(build_match_prompt(res_text, job_text), api_key, model_name,
+                                                     limiter=limiter, use_cache=attempt == 0,
+                                                     generation_config=json_config(MATCH_SCHEMA),
+                                                     hedge_model=hedge_model, hedge_percentile=hedge_percentile,
+                                                     accept=lambda text: parse_match(text) is not None)
+        if answered_by is None:
+            raise RuntimeError(response_text)
+        with metrics.timer("parse_seconds", kind="single"):
+            result = parse_match(response_text)
+        if result:
+            return result + (answered_by,)
+        metrics.inc("parse_failures_total", kind="single")
+    raise RuntimeError("No valid score in the response.")
+
+def score_resumes(resume_paths, job_text, api_key, model_name, extract_fn,
+                  max_workers=DEFAULT_WORKERS, limiter=None, on_result=None, on_failure=None,
+                  hedge_model=None, hedge_percentile=HEDGE_PERCENTILE):
+    # Runs extract -> prompt -> LLM -> parse for every resume on a bounded pool.
+    # The limiter (not the pool size) decides the request rate.
+    if limiter is None:
+        limiter = TokenBucket()
+    results = [None] * len(resume_paths)
+    failures = []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(score_resume, path, job_text, api_key, model_name, extract_fn, limiter,
+                        hedge_model=hedge_model, hedge_percentile=hedge_percentile): i
+            for i, path in enumerate(resume_paths)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+                if on_result:
+                    on_result(resume_paths[i], results[i])
+            except Exception as e:
+                failures.append((resume_paths[i], str(e)))
+                if on_failure:
+                    on_failure(resume_paths[i], str(e))
+
+    return [r for r in results if r is not None], failures
+
+def pack_batches(items, job_text, token_budget=DEFAULT_BATCH_TOKEN_BUDGET, max_batch_size=MAX_BATCH_SIZE):
+    # Greedily fills each request with (resume_id, text) items; the JD is counted once per batch.
+    budget = token_budget - estimate_tokens(job_text)
+    batches, current, used = [], [], 0
+    for item in items:
+        cost = estimate_tokens(item[1])
+        if current and (used + cost > budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def build_batch_prompt(batch, job_desc_text):
+    resumes = "\n\n".join(f"### Resume {resume_id}\n{text}" for resume_id, text in batch)
+    return f"""
+    Compare each of the following resumes with the given job description and perform, for every resume:
+    - Calculate the match percentage between the resume and the job description.
+    - Extract the candidate name.
+
+    Respond with only a JSON array and nothing else, with exactly one object per resume, for example:
+    [{{"resume_id": "R1", "candidate_name": "John Doe", "match_percentage": 85}}]
+
+    Job Description:
+    {job_desc_text}
+
+    Resumes:
+    {resumes}
+    """
+
+def score_batch(batch, job_text, api_key, model_name, limiter=None, max_attempts=3,
+                hedge_model=None, hedge_percentile=HEDGE_PERCENTILE):
+    results = {}
+    pending = list(batch)
+    for attempt in range(max_attempts):
+        prompt = build_batch_prompt(pending, job_text)
+        resume_ids = {resume_id for resume_id, _ in pending}
+        # A retry with the same pending set must not be answered from the cache.
+        response_text, answered_by = generate_answer(prompt, api_key, model_name, limiter=limiter,
+                                                     response_tokens=RESPONSE_TOKENS * len(pending),
+                                                     use_cache=attempt == 0, generation_config=json_config(BATCH_SCHEMA),
+                                                     hedge_model=hedge_model, hedge_percentile=hedge_percentile,
+                                                     accept=lambda text: bool(parse_batch(text, resume_ids)))
+        if answered_by is None:
+            raise RuntimeError(response_text)
+        with metrics.timer("parse_seconds", kind="batch"):
+            parsed = parse_batch(response_text, resume_ids)
+        results.update((resume_id, result + (answered_by,)) for resume_id, result in parsed.items())
+        pending = [item for item in pending if item[0] not in results]
+        metrics.inc("parse_failures_total", len(pending), kind="batch")
+        if not pending:
+            break
+    return results
+
+def score_resumes_batched(resume_paths, job_text, api_key, model_name, extract_fn,
+                          token_budget=DEFAULT_BATCH_TOKEN_BUDGET, max_workers=DEFAULT_WORKERS,
+                          limiter=None, on_result=None, on_failure=None, hedge_model=None,
+                          hedge_percentile=HEDGE_PERCENTILE):
+    # Same contract as score_resumes, but several resumes share one request and one copy of the JD.
+    if limiter is None:
+        limiter = TokenBucket()
+    items = [(f"R{i + 1}", extract_fn(path)) for i, path in enumerate(resume_paths)]
+    path_for = {resume_id: path for (resume_id, _), path in zip(items, resume_paths)}
+    results = {}
+    failures = []
+
+    def fail(resume_id, error):
+        failures.append((path_for[resume_id], error))
+        if on_failure:
+            on_failure(path_for[resume_id], error)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(score_batch, batch, job_text, api_key, model_name, limiter,
+                        hedge_model=hedge_model, hedge_percentile=hedge_percentile): batch
+            for batch in pack_batches(items, job_text, token_budget)
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                scored = future.result()
+            except Exception as e:
+                for resume_id, _ in batch:
+                    fail(resume_id, str(e))
+                continue
+            for resume_id, _ in batch:
+                if resume_id in scored:
+                    results[resume_id] = scored[resume_id]
+                    if on_result:
+                        on_result(path_for[resume_id], scored[resume_id])
+                else:
+                    fail(resume_id, "No valid score in the batch response.")
+
+    return [results[resume_id] for resume_id, _ in items if resume_id in results], failures
+
+def borderline(results, top_n, band=CASCADE_BAND):
+    # Keys of {key: result} whose score lies within band points of the top-N cutoff, i.e. the N-th best score.
+    # When everything makes the shortlist anyway there is no cutoff to be close to.
+    if len(results) <= top_n or top_n <= 0:
+        return []
+    cutoff = sorted((result[1] for result in results.values()), reverse=True)[top_n - 1]
+    return [key for key, result in results.items() if abs(result[1] - cutoff) <= band]
+
+def score_resumes_cascade(resume_paths, job_text, api_key, model_name, extract_fn, top_n, cheap_model=CASCADE_MODEL,
+                          band=CASCADE_BAND, token_budget=0, max_workers=DEFAULT_WORKERS, limiter=None,
+                          on_result=None, on_failure=None, on_rescore=None, saved=None, hedge_model=None,
+                          hedge_percentile=HEDGE_PERCENTILE, shortlist=None):
+    # Two-tier cascade: cheap_model scores every resume (batched when token_budget > 0), then model_name
+    # re-scores only the borderline ones. Returns (merged results, failures) like score_resumes; on_result sees
+    # every first-tier score and on_rescore(path, result) every second-tier score that replaces one.
+    # With a shortlist from earlier batches, the cutoff is taken over its scores plus this batch's.
+    # saved(model, paths) -> (completed, remaining, record), e.g. Results_Store.checkpoint, lets each tier reuse
+    # and save scores exactly as a single-model run of that model would.
+    if limiter is None:
+        limiter = TokenBucket()
+    if saved is None:
+        saved = lambda model, paths: ([], paths, None)
+
+    def run_tier(paths, model, on_score, on_error, hedge):
+        completed, remaining, record = saved(model, paths)
+        for path, result in completed:
+            on_score(path, result)
+
+        def scored(path, result):
+            if record:
+                record(path, result)
+            on_score(path, result)
+
+        if token_budget > 0:
+            return score_resumes_batched(remaining, job_text, api_key, model, extract_fn, token_budget=token_budget,
+                                         max_workers=max_workers, limiter=limiter, on_result=scored,
+                                         on_failure=on_error, hedge_model=hedge, hedge_percentile=hedge_percentile)[1]
+        return score_resumes(remaining, job_text, api_key, model, extract_fn, max_workers=max_workers, limiter=limiter,
+                             on_result=scored, on_failure=on_error, hedge_model=hedge,
+                             hedge_percentile=hedge_percentile)[1]
+
+    first = {}
+
+    def first_tier(path, result):
+        first[path] = result
+        if on_result:
+            on_result(path, result)
+
+    failures = run_tier(resume_paths, cheap_model, first_tier, on_failure, None)
+
+    scores = shortlist.scores() if shortlist is not None else {}
+    scores.update(first)
+    paths = [path for path in borderline(scores, top_n, band) if path in first]
+    metrics.inc("cascade_resumes_total", len(first), tier="cheap")
+    metrics.inc("cascade_resumes_total", len(paths), tier="strong")
+    # Status goes to stderr, so the CLI's shortlist on stdout stays clean.
+    print(f"Cascade: {len(paths)} of {len(first)} resume(s) are within {band:g} points of the top-{top_n} cutoff; "
+          f"re-scoring them with {model_name}", file=sys.stderr)
+    merged = dict(first)
+
+    def second_tier(path, result):
+        merged[path] = result
+        if on_rescore:
+            on_rescore(path, result)
+
+    # A borderline resume the strong model cannot score keeps its first-tier score.
+    for path, error in run_tier(paths, model_name, second_tier, None, hedge_model):
+        print(f"Keeping the {cheap_model} score for {path}: {error}", file=sys.stderr)
+    return [merged[path] for path in resume_paths if path in merged], failures
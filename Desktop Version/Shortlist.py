@@ -0,0 +1,52 @@
+import heapq
+import itertools
+
+class Shortlist:
+    # Keeps only the best top_n results in a min-heap: each new score costs O(log top_n),
+    # memory stays bounded however many resumes are scored, and the current shortlist can be read at any time.
+    # A rescorable shortlist also remembers every score, because a lowered score can let an evicted one back in.
+    def __init__(self, top_n, rescorable=False):
+        self.top_n = top_n
+        self.count = 0
+        self._heap = []
+        self._order = itertools.count()
+        self._entries = {} if rescorable else None
+
+    def add(self, key, result):
+        # result is (candidate_name, match_percentage, raw, model). Returns True when the shortlist changed.
+        # On equal scores the earlier result stays ahead, like a stable sort would keep it.
+        self.count += 1
+        entry = (result[1], -next(self._order), key, result)
+        if self._entries is not None:
+            self._entries[key] = entry
+        if self.top_n <= 0:
+            return False
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def replace(self, key, result):
+        # A new score for a key added earlier (e.g. a cascade's second opinion); it does not count as another result
+        # and keeps the key's original place among equal scores. The top N is recomputed from every score.
+        if self._entries is None:
+            raise ValueError("Only a rescorable Shortlist can replace scores.")
+        self._entries[key] = (result[1], self._entries[key][1], key, result)
+        self._heap = heapq.nlargest(self.top_n, self._entries.values(), key=lambda e: e[:2])
+        heapq.heapify(self._heap)
+        return True
+
+    def scores(self):
+        # {key: result} for every score a rescorable shortlist has seen, otherwise for the current top N.
+        entries = list(self._entries.values()) if self._entries is not None else list(self._heap)
+        return {key: result for _, _, key, result in entries}
+
+    def items(self):
+        # [(key, result)], best first.
+        return [(key, result) for _, _, key, result in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+    def results(self):
+        return [result for _, result in self.items()]
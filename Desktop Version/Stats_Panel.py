@@ -0,0 +1,38 @@
+import tkinter as tk
+from tkinter import filedialog, messagebox, scrolledtext
+from Metrics import metrics
+
+def show_stats_panel(parent, mode):
+    # Live view of the Metrics counters: where this session's time, tokens and quota went.
+    win = tk.Toplevel(parent)
+    win.title("Run Statistics")
+    win.geometry("760x450")
+
+    text_box = scrolledtext.ScrolledText(win, wrap=tk.NONE, font=("Courier", 9))
+    text_box.pack(expand=True, fill="both")
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        text_box.delete("1.0", tk.END)
+        text_box.insert(tk.END, "\n".join(metrics.summary()))
+        win.after(2000, refresh)
+
+    def export():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".json", initialfile=f"{mode}_metrics.json",
+                                            filetypes=[("JSON", "*.json"), ("Prometheus text", "*.prom")])
+        if path:
+            metrics.dump(path)
+            messagebox.showinfo("Exported", f"Metrics saved to {path}", parent=win)
+
+    def reset():
+        metrics.reset()
+        text_box.delete("1.0", tk.END)
+        text_box.insert(tk.END, "\n".join(metrics.summary()))
+
+    button_frame = tk.Frame(win)
+    button_frame.pack(pady=5)
+    tk.Button(button_frame, text="Export (JSON/Prometheus)", command=export).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+
+    refresh()
@@ -0,0 +1,86 @@
+import tkinter as tk
+from tkinter import messagebox, scrolledtext
+import queue
+import threading
+import pyperclip
+from Metrics import metrics, save_run
+
+def show_stream_result(parent, title, model_text, chunks, mode, on_done=None, error_prefix=""):
+    # Shows a streamed analysis as it arrives, with a button for the generated resume code.
+    # The response is read on a worker thread and appended here as chunks arrive.
+    result_window = tk.Toplevel(parent)
+    result_window.title(title)
+    result_window.geometry("800x600")
+
+    model_label = tk.Label(result_window, text=model_text, fg="blue", font=("Arial", 10, "italic"))
+    model_label.pack(pady=5)
+
+    text_box = scrolledtext.ScrolledText(result_window, wrap=tk.WORD, font=("Arial", 10))
+    text_box.pack(expand=True, fill="both")
+
+    received = []
+    updates = queue.Queue()
+
+    def show_code():
+        text = "".join(received)
+        code_window = tk.Toplevel(result_window)
+        code_window.title("Generated Resume Code")
+        code_window.geometry("800x600")
+        code_box = scrolledtext.ScrolledText(code_window, wrap=tk.WORD, font=("Courier", 10))
+
+        start = text.lower().find("generated resume code")
+        if start != -1:
+            code = text[start:].split("\n", 1)[-1].strip()
+        else:
+            code = "No code found"
+        code_box.insert(tk.END, code)
+        code_box.pack(expand=True, fill="both")
+
+        def copy_code():
+            pyperclip.copy(code)
+            messagebox.showinfo("Copied", "Code copied to clipboard!")
+
+        copy_btn = tk.Button(code_window, text="Copy Code", command=copy_code)
+        copy_btn.pack(pady=5)
+
+    show_code_btn = tk.Button(result_window, text="Show Resume Code", command=show_code, state=tk.DISABLED)
+    show_code_btn.pack(pady=5)
+
+    def consume():
+        try:
+            for chunk in chunks:
+                updates.put(chunk)
+        except Exception as e:
+            updates.put(e)
+        updates.put(None)
+
+    def poll():
+        # A closed window stops showing chunks, but the stream is still read to the end so on_done
+        # (and with it the next job description) always runs.
+        shown = bool(result_window.winfo_exists())
+        while True:
+            try:
+                item = updates.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                if shown:
+                    show_code_btn.config(state=tk.NORMAL)
+                save_run(mode)
+                if on_done:
+                    on_done("".join(received))
+                return
+            if isinstance(item, Exception):
+                messagebox.showerror("Error", f"{error_prefix}{item}")
+                continue
+            received.append(item)
+            if not shown:
+                continue
+            with metrics.timer("ui_render_seconds", mode=mode):
+                text_box.insert(tk.END, item)
+            if "generated resume code" in "".join(received[-2:]).lower():
+                show_code_btn.config(state=tk.NORMAL)
+        (result_window if shown else parent).after(100, poll)
+
+    threading.Thread(target=consume, daemon=True).start()
+    result_window.after(100, poll)
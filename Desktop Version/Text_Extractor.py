@@ -0,0 +1,216 @@
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import fitz  # PyMuPDF
+import docx
+from Disk_Cache import DiskCache
+from Metrics import metrics
+
+# Bump whenever the extraction output changes so stale cache entries are never reused.
+EXTRACTOR_VERSION = "3"
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# A resume never needs more than this; anything past it (e.g. a portfolio uploaded by mistake) is dropped.
+MAX_PDF_PAGES = 20
+MAX_PDF_CHARS = 100000
+
+text_cache = DiskCache("extracted_text", max_bytes=200 * 1024 * 1024)
+
+def iter_pdf_pages(source, max_pages=MAX_PDF_PAGES, max_chars=MAX_PDF_CHARS, report=None):
+    # Yields one page of text at a time from a path or bytes, so only the current page is held in memory.
+    # The document is closed as soon as the caller stops iterating or the limits are reached.
+    # Pages without any fonts are image-only scans; they are skipped without running text extraction.
+    if report is None:
+        report = {}
+    report.update(pages=0, skipped_pages=[], truncated=False)
+    doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    with doc:
+        report["pages"] = doc.page_count
+        chars = 0
+        for number in range(doc.page_count):
+            if number >= max_pages or chars >= max_chars:
+                report["truncated"] = True
+                break
+            page = doc.load_page(number)
+            if not page.get_fonts():
+                report["skipped_pages"].append(number + 1)
+                continue
+            text = page.get_text()
+            if chars + len(text) > max_chars:
+                text = text[:max_chars - chars]
+                report["truncated"] = True
+            chars += len(text)
+            yield text
+
+def _extract_pdf(source, report=None):
+    # Pages are separated by form feeds so Text_Normalizer can spot repeated headers and footers.
+    return "\f".join(iter_pdf_pages(source, report=report))
+
+def _extract_docx(source):
+    doc = docx.Document(source if isinstance(source, str) else io.BytesIO(source))
+    return "\n".join([para.text for para in doc.paragraphs])
+
+def _cache_key(digest, ext):
+    return f"{EXTRACTOR_VERSION}:{MAX_PDF_PAGES}:{MAX_PDF_CHARS}:{ext}:{digest}"
+
+def content_key(data, ext):
+    return _cache_key(hashlib.sha256(data).hexdigest(), ext)
+
+def file_content_key(file_path, ext):
+    # Same key as content_key, but hashed in chunks so a huge file is never read into memory at once.
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return _cache_key(digest.hexdigest(), ext)
+
+def _cache_get(key, report=None):
+    text = text_cache.get(key)
+    metrics.inc("extract_cache_total", result="miss" if text is None else "hit")
+    if text is not None and report is not None:
+        pages = text_cache.get(key + ":pages")
+        if pages is not None:
+            report.update(json.loads(pages))
+    return text
+
+def _cache_put(key, text, report=None):
+    text_cache.put(key, text)
+    if report:
+        text_cache.put(key + ":pages", json.dumps(report))
+
+def _parse(source, ext, report=None):
+    # source is either a path or the file's bytes (a memoryview is passed through without copying).
+    if ext == ".pdf":
+        return _extract_pdf(source, report)
+    if ext == ".docx":
+        return _extract_docx(source)
+    if ext == ".txt":
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                source = f.read()
+        return str(source, "utf-8")
+    raise ValueError(f"Unsupported file format '{ext}'")
+
+def _parse_file(file_path, ext):
+    # Runs in a worker process; it opens the file itself so only the path and the text cross the process boundary.
+    # The parse time goes back with the text, since the worker's own metrics never reach this process.
+    report = {}
+    start = time.perf_counter()
+    text = _parse(file_path, ext, report)
+    return text, report, time.perf_counter() - start
+
+def _timed_parse(source, ext, report):
+    with metrics.timer("extract_seconds", format=ext):
+        return _parse(source, ext, report)
+
+def extract_text_from_bytes(data, ext, report=None):
+    ext = ext.lower()
+    key = content_key(data, ext)
+    cached = _cache_get(key, report)
+    if cached is not None:
+        return cached
+
+    if report is None:
+        report = {}
+    text = _timed_parse(data, ext, report)
+    _cache_put(key, text, report)
+    return text
+
+def extract_text_from_file(file_path, report=None):
+    if not os.path.exists(file_path):
+        return f"Error: File not found at '{file_path}'. Please check the path."
+
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        return f"Error: Unsupported file format '{ext}'. Please use PDF/DOCX/TXT format only"
+
+    try:
+        key = file_content_key(file_path, ext)
+        cached = _cache_get(key, report)
+        if cached is not None:
+            return cached
+        if report is None:
+            report = {}
+        text = _timed_parse(file_path, ext, report)
+        _cache_put(key, text, report)
+        return text
+    except Exception as e:
+        return _error_message(e)
+
+def _error_message(error):
+    if isinstance(error, UnicodeDecodeError):
+        return "Error: Unable to decode the text. Please ensure the file is encoded in UTF-8."
+    return f"Error reading file: {str(error)}"
+
+def format_page_report(name, report):
+    # One line for a PDF that lost pages to the limits or to image-only scans, "" otherwise.
+    notes = []
+    if report.get("skipped_pages"):
+        notes.append("skipped image-only page(s) " + ", ".join(str(n) for n in report["skipped_pages"]))
+    if report.get("truncated"):
+        notes.append(f"truncated at the {MAX_PDF_PAGES}-page / {MAX_PDF_CHARS}-character limit ({report['pages']} pages in file)")
+    return f"{name}: " + "; ".join(notes) if notes else ""
+
+def extract_texts_parallel(file_paths, max_workers=None, on_result=None, reports=None):
+    # Cache hits are served in this process; only the misses are parsed, one worker process per core by default.
+    # Returns the texts in input order (None where extraction failed) and a separate list of (path, error).
+    # If reports is a dict it is filled with {path: page report} for every PDF.
+    texts = [None] * len(file_paths)
+    failures = []
+    misses = {}
+
+    def done(i, text):
+        texts[i] = text
+        if on_result:
+            on_result(file_paths[i], text)
+
+    for i, path in enumerate(file_paths):
+        ext = os.path.splitext(path)[1].lower()
+        if not os.path.exists(path):
+            failures.append((path, f"Error: File not found at '{path}'. Please check the path."))
+        elif ext not in SUPPORTED_EXTENSIONS:
+            failures.append((path, f"Error: Unsupported file format '{ext}'. Please use PDF/DOCX/TXT format only"))
+        else:
+            report = {}
+            try:
+                key = file_content_key(path, ext)
+            except Exception as e:
+                failures.append((path, _error_message(e)))
+                continue
+            cached = _cache_get(key, report)
+            if cached is not None:
+                if report and reports is not None:
+                    reports[path] = report
+                done(i, cached)
+            else:
+                misses[i] = (key, ext)
+
+    def finish(i, parse):
+        try:
+            text, report, seconds = parse()
+        except Exception as e:
+            metrics.inc("extract_failures_total", format=misses[i][1])
+            failures.append((file_paths[i], _error_message(e)))
+            return
+        metrics.observe("extract_seconds", seconds, format=misses[i][1])
+        _cache_put(misses[i][0], text, report)
+        if report and reports is not None:
+            reports[file_paths[i]] = report
+        done(i, text)
+
+    workers = min(len(misses), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        # Not worth starting a pool for a single document.
+        for i, (key, ext) in misses.items():
+            finish(i, lambda: _parse_file(file_paths[i], ext))
+        return texts, failures
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_parse_file, file_paths[i], ext): i for i, (key, ext) in misses.items()}
+        for future in as_completed(futures):
+            finish(futures[future], future.result)
+    return texts, failures
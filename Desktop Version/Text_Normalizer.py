@@ -0,0 +1,111 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from Metrics import metrics
+
+# Per-document prompt budget; a one-page resume is usually well under 1,500 tokens.
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Dropped first, in this order, when a document is over its budget.
+LOW_VALUE_SECTIONS = (
+    "references", "declaration", "hobbies", "interests", "hobbies and interests", "personal details",
+    "personal information", "languages known", "extracurricular activities", "extra-curricular activities",
+    "publications", "conferences", "workshops", "achievements and awards", "awards"
+)
+
+REPORT_STAGES = ("raw", "headers_removed", "cleaned", "budgeted")
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for quota planning.
+    return max(1, len(text) // 4)
+
+# Footers such as "Page 2 of 5", "2 / 5", "- 2 -" or a bare "2". Four-digit numbers are left alone, they are years.
+PAGE_NUMBER = re.compile(r"(page\s*\d+(\s*(of|/)\s*\d+)?|\d{1,3}\s*(of|/)\s*\d{1,3}|-?\s*\d{1,3}\s*-?)", re.IGNORECASE)
+
+def _line_key(line):
+    # Only lines repeated verbatim count as a header; "2016 - 2020" and "2014 - 2016" are different lines.
+    return " ".join(line.split())
+
+def remove_repeated_headers(text, edge_lines=3, min_pages=3):
+    # PDF pages are separated by form feeds. Lines repeated verbatim at the top or bottom of most pages are
+    # kept once, where they first appear (often the candidate's name and contact line), and page numbers there
+    # are dropped. With fewer than min_pages pages a repeat proves nothing.
+    pages = text.split("\f")
+    if len(pages) < min_pages:
+        return text
+
+    def edges(lines):
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        return set(filled[:edge_lines] + filled[-edge_lines:])
+
+    page_lines = [page.splitlines() for page in pages]
+    counts = Counter()
+    for lines in page_lines:
+        counts.update({_line_key(lines[i]) for i in edges(lines)})
+    threshold = max(2, math.ceil(0.6 * len(pages)))
+    repeated = {key for key, count in counts.items() if count >= threshold}
+
+    kept = []
+    seen = set()
+    for lines in page_lines:
+        drop = set()
+        for i in sorted(edges(lines)):
+            key = _line_key(lines[i])
+            if PAGE_NUMBER.fullmatch(key) or key in seen:
+                drop.add(i)
+            elif key in repeated:
+                seen.add(key)
+        kept.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return "\n".join(kept)
+
+def clean_text(text):
+    # NFKC folds ligatures such as "ﬁ" into "fi"; control characters and U+FFFD are extraction garbage.
+    text = unicodedata.normalize("NFKC", text).replace("\f", "\n")
+    text = "".join(ch for ch in text if ch in "\n\t" or unicodedata.category(ch)[0] != "C")
+    text = text.replace("\ufffd", "")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+def _split_sections(text):
+    sections = [[None, []]]
+    for line in text.splitlines():
+        heading = line.strip().rstrip(":").lower()
+        if heading in LOW_VALUE_SECTIONS or (len(line) <= 40 and line.isupper()):
+            sections.append([heading, []])
+        sections[-1][1].append(line)
+    return sections
+
+def trim_to_budget(text, max_tokens=DEFAULT_TOKEN_BUDGET):
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sections = _split_sections(text)
+    for name in LOW_VALUE_SECTIONS:
+        sections = [section for section in sections if section[0] != name]
+        text = "\n".join(line for _, lines in sections for line in lines)
+        if estimate_tokens(text) <= max_tokens:
+            return text
+
+    # Still too long: keep the head of the document, which holds the summary, skills and recent work.
+    cut = text[:max_tokens * 4]
+    return cut[:cut.rfind("\n")] + "\n[...truncated...]" if "\n" in cut else cut
+
+def normalize_text(text, max_tokens=DEFAULT_TOKEN_BUDGET, report=None):
+    # `report` (a dict) accumulates token counts after each stage, so callers can sum them over a batch.
+    with metrics.timer("prompt_build_seconds", stage="normalize"):
+        stages = [text]
+        stages.append(remove_repeated_headers(stages[-1]))
+        stages.append(clean_text(stages[-1]))
+        stages.append(trim_to_budget(stages[-1], max_tokens))
+    if report is not None:
+        for stage, stage_text in zip(REPORT_STAGES, stages):
+            report[stage] = report.get(stage, 0) + estimate_tokens(stage_text)
+    return stages[-1]
+
+def format_report(report):
+    parts = [f"raw {report.get('raw', 0)}"]
+    for previous, stage in zip(REPORT_STAGES, REPORT_STAGES[1:]):
+        saved = report.get(previous, 0) - report.get(stage, 0)
+        parts.append(f"{stage.replace('_', ' ')} {report.get(stage, 0)} (-{saved})")
+    return "Prompt tokens: " + " -> ".join(parts)
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+from google.api_core.exceptions import ResourceExhausted
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Model_Router import ModelRouter, reset_health
+from Quota_Ledger import QuotaLedger
+
+class SpentDailyQuotaTest(unittest.TestCase):
+    def setUp(self):
+        reset_health()
+        self.dir = tempfile.TemporaryDirectory()
+        # One request per day, plenty per minute.
+        self.ledger = QuotaLedger(os.path.join(self.dir.name, "ledger.sqlite3"), limits=[("", (100, 10**9, 1))])
+
+    def tearDown(self):
+        self.ledger._conn.close()
+        self.dir.cleanup()
+        reset_health()
+
+    def test_single_route_raises_instead_of_sleeping(self):
+        router = ModelRouter("only-key", "gemini-1.5-pro")
+        send = lambda key, model: self.ledger.reserve(key, model, 10)
+        router.call(send)
+        with mock.patch("Model_Router.time.sleep", side_effect=AssertionError("slept")):
+            start = time.monotonic()
+            with self.assertRaises(ResourceExhausted):
+                router.call(send)
+        self.assertLess(time.monotonic() - start, 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Text_Normalizer import remove_repeated_headers
+
+class RemoveRepeatedHeadersTest(unittest.TestCase):
+    def test_keeps_first_copy_of_repeated_name_header(self):
+        header = "Jane Q. Doe | jane@x.com"
+        pages = [f"{header}\nExperience line {n}\nMore detail {n}\nPage {n} of 3" for n in (1, 2, 3)]
+        result = remove_repeated_headers("\f".join(pages))
+        self.assertEqual(result.count(header), 1)
+        self.assertTrue(result.startswith(header))
+        for n in (1, 2, 3):
+            self.assertIn(f"Experience line {n}", result)
+            self.assertNotIn(f"Page {n} of 3", result)
+
+    def test_short_documents_are_untouched(self):
+        text = "Jane Doe\nSkills\f1\nJane Doe\nProjects"
+        self.assertEqual(remove_repeated_headers(text), text)
+
+if __name__ == "__main__":
+    unittest.main()
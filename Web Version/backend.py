@@ -1,27 +1,99 @@
 # === backend.py ===
 %%writefile backend.py
 
-import fitz  # PyMuPDF
-import docx
 import os
-import google.generativeai as genai
+import threading
+import time
+import streamlit as st
+from google.api_core.exceptions import ResourceExhausted
+from Gemini_Client import generate_text, generate_routed, generate_hedged
+from Metrics import metrics
+from Model_Router import retry_delay_hint
+from Quota_Ledger import short_model_name
+from Lexical_Ranker import bm25_scores, rank_top_k, to_percentages
+from Response_Parser import SCORE_SCHEMA, json_config, parse_match
+from Text_Extractor import SUPPORTED_EXTENSIONS, content_key, extract_text_from_bytes
+from Text_Normalizer import normalize_text
+
+# AIMD throttle: run at full speed until a 429 arrives, halve the rate on every 429
+# and creep back up by a fixed step after each success.
+class AdaptiveThrottle:
+    def __init__(self, increase=0.02, decrease=0.5, floor=1 / 120, ceiling=2.0):
+        self.increase = increase
+        self.decrease = decrease
+        self.floor = floor
+        self.ceiling = ceiling
+        self.rate = None  # requests per second, None = unthrottled
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + (1 / self.rate if self.rate else 0)
+        if start > now:
+            metrics.observe("throttle_wait_seconds", start - now)
+            time.sleep(start - now)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate is not None:
+                self.rate += self.increase
+                if self.rate >= self.ceiling:
+                    self.rate = None
+
+    def on_throttled(self, retry_delay=None):
+        with self._lock:
+            current = self.rate if self.rate is not None else self.ceiling
+            self.rate = max(self.floor, current * self.decrease)
+            delay = retry_delay if retry_delay is not None else 1 / self.rate
+            self._next_slot = max(self._next_slot, time.monotonic() + delay)
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def get_throttle(api_key):
+    with _throttles_lock:
+        if api_key not in _throttles:
+            _throttles[api_key] = AdaptiveThrottle()
+        return _throttles[api_key]
+
+def generate_with_throttle(model, prompt, api_key):
+    # One paced attempt; a 429 slows this key down and goes back to Model_Router, which tries another
+    # key or model, or waits for this one to reopen.
+    throttle = get_throttle(api_key)
+    throttle.wait()
+    try:
+        response = model.generate_content(prompt)
+    except ResourceExhausted as e:
+        throttle.on_throttled(retry_delay_hint(e))
+        raise
+    throttle.on_success()
+    return response
+
+@st.cache_data(max_entries=1000, ttl=24 * 3600, show_spinner=False)
+def _extract_cached(key, ext, _data):
+    # Streamlit skips hashing arguments that start with an underscore; the content key already identifies the upload.
+    return normalize_text(extract_text_from_bytes(_data, ext))
 
 def extract_text(uploaded_file):
+    # Memoized by content hash, so reruns (e.g. changing a selectbox) and repeat uploads never re-parse.
+    # getbuffer() is a view of the upload, so the bytes reach fitz.open(stream=...) without being copied.
     ext = os.path.splitext(uploaded_file.name)[1].lower()
-    if ext == ".pdf":
-        doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-        return "\n".join([page.get_text() for page in doc])
-    elif ext == ".docx":
-        doc = docx.Document(uploaded_file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    elif ext == ".txt":
-        return uploaded_file.read().decode("utf-8")
-    else:
+    if ext not in SUPPORTED_EXTENSIONS:
         return "Unsupported file format."
+    data = uploaded_file.getbuffer()
+    return _extract_cached(content_key(data, ext), ext, data)
+
+def throttled_send(api_key):
+    # Passed as send_for, so every API key gets its own throttle.
+    return lambda model, prompt: generate_with_throttle(model, prompt, api_key)
+
+# Rounds of waiting for a rate-limited key to reopen before a request gives up.
+MAX_WAIT_ROUNDS = 6
 
 def analyze_resume_with_google_ai(resume_text, jd_text, api_key, code_type, pages, model_name):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
     prompt = f"""
     Analyze the provided resume and job description thoroughly. Perform the following tasks:
 
@@ -50,23 +122,43 @@ def analyze_resume_with_google_ai(resume_text, jd_text, api_key, code_type, page
     **Suggested Resume Template**: Name and Website
     **Generated Resume Code**: (Formatted code)
     """
-    response = model.generate_content(prompt)
-    return response.text
+    return generate_text(prompt, api_key, model_name, send_for=throttled_send, max_rounds=MAX_WAIT_ROUNDS)
 
-def get_match_only(resume_text, jd_text, api_key, model_name):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
+def get_match_only(resume_text, jd_text, api_key, model_name, max_attempts=3, hedge_model=None):
+    # (match percentage, model that answered). With a hedge_model, a request slower than the model usually
+    # takes is also sent to hedge_model and the first valid answer wins.
     prompt = f"""
-    Compare the resume with the job description. Just output the match percentage.
+    Compare the resume with the job description. Respond with only a JSON object holding the match percentage, for example:
+    {{"match_percentage": 85}}
 
     Resume:
     {resume_text}
 
     Job Description:
     {jd_text}
-
-    Format:
-    Match: NN%
     """
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    for attempt in range(max_attempts):
+        # Only an answer that fails validation is asked again, and not from the cache.
+        if hedge_model:
+            text, answered_by = generate_hedged(prompt, api_key, model_name, hedge_model, json_config(SCORE_SCHEMA),
+                                                use_cache=attempt == 0, send_for=throttled_send,
+                                                max_rounds=MAX_WAIT_ROUNDS,
+                                                accept=lambda answer: parse_match(answer) is not None)
+        else:
+            text, answered_by = generate_routed(prompt, api_key, model_name, json_config(SCORE_SCHEMA),
+                                                use_cache=attempt == 0, send_for=throttled_send,
+                                                max_rounds=MAX_WAIT_ROUNDS)
+        result = parse_match(text)
+        if result:
+            return result[1], short_model_name(answered_by)
+    raise ValueError("No valid match percentage in the response.")
+
+def match_job(label, pairs, api_key, model_name, hedge_model, emit):
+    # Background job body (see jobs.py): pairs are (name, resume_text, jd_text); one row is emitted per pair,
+    # and a failed pair is reported in its row instead of stopping the rest.
+    for name, resume_text, jd_text in pairs:
+        try:
+            percent, answered_by = get_match_only(resume_text, jd_text, api_key, model_name, hedge_model=hedge_model)
+            emit({label: name, "Match %": percent, "Model": answered_by})
+        except Exception as e:
+            emit({label: name, "Match %": None, "Error": str(e)})
@@ -1,11 +1,17 @@
 # === app.py ===
 %%writefile app.py
 
+import json
 import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from backend import extract_text, analyze_resume_with_google_ai, get_match_only
+from backend import extract_text, analyze_resume_with_google_ai, match_job, bm25_scores, rank_top_k, to_percentages
+from jobs import submit_job, get_job, is_active
+from Metrics import metrics
+from Model_Comparison import load_evaluation, pick_model, DEFAULT_MIN_ACCURACY
+
+POLL_SECONDS = 2
 
 st.set_page_config(page_title="AI Resume Analyzer", layout="centered")
 
@@ -30,28 +36,41 @@ MODEL_OPTIONS = [
     "gemini-2.0-pro-exp"
 ]
 
-
-accuracy_map = {
-    "gemini-1.5-pro-latest": 92,
-    "gemini-1.5-flash-latest": 89,
-    "gemini-1.5-pro-002": 88,
-    "gemini-1.5-pro-001": 86,
-    "gemini-1.5-pro": 85,
-    "gemini-2.0-flash": 83,
-    "gemini-2.0-flash-lite": 81,
-    "gemini-2.5-flash-preview-04-17": 87,
-    "gemini-2.0-flash-thinking-exp-01-21": 84,
-    "gemini-2.5-pro-exp-03-25": 94,
-    "gemini-2.0-flash-lite-preview-02-05": 80,
-    "gemini-1.5-flash-8b": 82,
-    "gemini-1.5-flash-002": 88,
-    "gemini-2.0-pro-exp": 90
-}
+def show_job(param, label, top_n=None):
+    # Renders whatever the background job named in the URL has finished so far, so a refresh loses nothing.
+    job_id = st.query_params.get(param)
+    if not job_id:
+        return None
+    job = get_job(job_id)
+    if job is None:
+        st.warning("This analysis is no longer available. Please run it again.")
+        return None
+
+    rows = job["results"]
+    st.progress(len(rows) / max(job["total"], 1), text=f"{job['status'].capitalize()}: {len(rows)}/{job['total']} done")
+    if job["error"]:
+        st.error(f"Error: {job['error']}")
+    failed = [row for row in rows if row.get("Error")]
+    if failed:
+        st.warning(f"{len(failed)} item(s) failed: " + "; ".join(f"{row[label]}: {row['Error']}" for row in failed))
+
+    scores = [row for row in rows if not row.get("Error")]
+    if scores:
+        with metrics.timer("ui_render_seconds", mode="web"):
+            # Rows record the model that answered, which differs from the selected one after a failover or hedge.
+            df = pd.DataFrame(scores)
+            df = df[[label, "Match %"] + (["Model"] if "Model" in df else [])].sort_values("Match %", ascending=False)
+            if top_n:
+                df = df.head(top_n)
+            st.dataframe(df)
+            fig = px.bar(df, x="Match %", y=label, orientation="h", color="Match %", text="Match %")
+            st.plotly_chart(fig, use_container_width=True)
+    return job
 
 # === Candidate Mode ===
 with tab1:
     st.header("Candidate Mode")
-    api_key = st.text_input("🔑 API Key", type="password", key="candidate_api")
+    api_key = st.text_input("🔑 API Key(s), comma-separated", type="password", key="candidate_api")
     selected_model = st.selectbox("Select Gemini Model", MODEL_OPTIONS, key="candidate_model")
     resume_file = st.file_uploader("Upload Your Resume", type=["pdf", "docx", "txt"], key="candidate_resume")
     jd_files = st.file_uploader("Upload Job Descriptions", type=["pdf", "docx", "txt"], accept_multiple_files=True, key="candidate_jds")
@@ -62,78 +81,79 @@ with tab1:
             st.error("All fields are required.")
         else:
             resume_text = extract_text(resume_file)
-            scores = []
-            with st.spinner("Processing..."):
-                for jd in jd_files:
-                    jd_text = extract_text(jd)
-                    result = get_match_only(resume_text, jd_text, api_key, selected_model)
-                    time.sleep(60)
-                    match = next((line for line in result.splitlines() if "Match" in line), "Match: 0%")
-                    percent = int("".join(filter(str.isdigit, match)))
-                    scores.append({"Job Description": jd.name, "Match %": percent})
-                    time.sleep(60)
+            pairs = [(jd.name, resume_text, extract_text(jd)) for jd in jd_files]
+            st.query_params["candidate_job"] = submit_job("candidate", len(pairs), match_job, "Job Description",
+                                                          pairs, api_key, selected_model, None)
 
-            df = pd.DataFrame(scores)
-            st.dataframe(df)
-            fig = px.bar(df, x="Match %", y="Job Description", orientation="h", color="Match %", text="Match %")
-            st.plotly_chart(fig, use_container_width=True)
+    candidate_job = show_job("candidate_job", "Job Description")
+
+    if candidate_job and candidate_job["status"] == "done" and all([api_key, resume_file, jd_files]):
+        # Optional advanced resume generation
+        st.subheader("🧠 Want to auto-generate a tailored resume?")
+        code_type = st.selectbox("Resume Code Format", ["LaTex", "HTML and CSS"], key="candidate_code_type")
+        pages = st.selectbox("Resume Length", ["one", "multi"], key="candidate_pages")
+
+        if st.button("Generate Tailored Resume"):
+            resume_text = extract_text(resume_file)
+            jd_text = extract_text(jd_files[0])  # Assume first JD is main one
+            with st.spinner("Generating optimized resume..."):
+                try:
+                    result = analyze_resume_with_google_ai(resume_text, jd_text, api_key, code_type, pages, selected_model)
+                    st.success("✅ Resume generated!")
+
+                    st.markdown("### Result Summary")
+                    st.markdown(result)
 
-            # Optional advanced resume generation
-            st.subheader("🧠 Want to auto-generate a tailored resume?")
-            code_type = st.selectbox("Resume Code Format", ["LaTex", "HTML and CSS"], key="candidate_code_type")
-            pages = st.selectbox("Resume Length", ["one", "multi"], key="candidate_pages")
-
-            if st.button("Generate Tailored Resume"):
-                jd_text = extract_text(jd_files[0])  # Assume first JD is main one
-                with st.spinner("Generating optimized resume..."):
-                    try:
-                        result = analyze_resume_with_google_ai(resume_text, jd_text, api_key, code_type, pages, selected_model)
-                        st.success("✅ Resume generated!")
-
-                        st.markdown("### Result Summary")
-                        st.markdown(result)
-
-                        if "Generated Resume Code" in result:
-                            with st.expander("📄 Show Generated Resume Code"):
-                                code = result.split("Generated Resume Code")[-1].strip()
-                                st.code(code, language="html" if code_type == "HTML and CSS" else "latex")
-                                st.download_button("📥 Copy Code", code, file_name="resume_code.txt")
-                    except Exception as e:
-                        st.error(f"Error: {e}")
+                    if "Generated Resume Code" in result:
+                        with st.expander("📄 Show Generated Resume Code"):
+                            code = result.split("Generated Resume Code")[-1].strip()
+                            st.code(code, language="html" if code_type == "HTML and CSS" else "latex")
+                            st.download_button("📥 Copy Code", code, file_name="resume_code.txt")
+                except Exception as e:
+                    st.error(f"Error: {e}")
 
 # === Recruiter Mode ===
 with tab2:
     st.header("Recruiter Mode")
-    api_key = st.text_input("🔑 API Key", type="password", key="recruiter_api")
+    api_key = st.text_input("🔑 API Key(s), comma-separated", type="password", key="recruiter_api")
     selected_model = st.selectbox("Select Gemini Model", MODEL_OPTIONS, key="recruiter_model")
     jd_file = st.file_uploader("Upload Job Description", type=["pdf", "docx", "txt"], key ="candidate_jd")
     resumes = st.file_uploader("Upload Multiple Resumes", type=["pdf", "docx", "txt"], accept_multiple_files=True, key="candidate_resumes")
+    top_n = st.number_input("Number of Candidates to Shortlist", min_value=1, value=10, key="recruiter_top_n")
+    prerank_factor = st.number_input("Pre-rank factor (only the top factor × N resumes go to Gemini, 0 = all)", min_value=0, value=3, key="recruiter_prerank")
+    fast_mode = st.checkbox("⚡ Fast mode (local ranking only, no API calls)", key="recruiter_fast")
+    hedge_model = st.selectbox("Hedge slow requests with (the first valid answer wins)", ["None"] + MODEL_OPTIONS,
+                               key="recruiter_hedge")
 
     if st.button("Analyze Candidates"):
-        if not all([api_key, jd_file, resumes]):
+        if not all([jd_file, resumes]) or not (api_key or fast_mode):
             st.error("All fields are required.")
         else:
             jd_text = extract_text(jd_file)
-            scores = []
-            with st.spinner("Processing..."):
-                for resume in resumes:
-                    resume_text = extract_text(resume)
-                    result = get_match_only(resume_text, jd_text, api_key, selected_model)
-                    time.sleep(60)
-                    match = next((line for line in result.splitlines() if "Match" in line), "Match: 0%")
-                    percent = int("".join(filter(str.isdigit, match)))
-                    scores.append({"Resume": resume.name, "Match %": percent})
-                    time.sleep(60)
-
-            df = pd.DataFrame(scores)
-            st.dataframe(df)
-            fig = px.bar(df, x="Match %", y="Resume", orientation="h", color="Match %", text="Match %")
-            st.plotly_chart(fig, use_container_width=True)
+            resume_texts = [extract_text(resume) for resume in resumes]
+            if fast_mode:
+                st.query_params.pop("recruiter_job", None)
+                percentages = to_percentages(bm25_scores(jd_text, resume_texts))
+                scores = [{"Resume": resume.name, "Match %": pct} for resume, pct in zip(resumes, percentages)]
+                df = pd.DataFrame(scores).sort_values("Match %", ascending=False).head(top_n)
+                st.dataframe(df)
+                fig = px.bar(df, x="Match %", y="Resume", orientation="h", color="Match %", text="Match %")
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                selected = range(len(resumes))
+                if prerank_factor > 0:
+                    selected, _ = rank_top_k(jd_text, resume_texts, prerank_factor * top_n)
+                pairs = [(resumes[i].name, resume_texts[i], jd_text) for i in selected]
+                st.query_params["recruiter_job"] = submit_job("recruiter", len(pairs), match_job, "Resume",
+                                                              pairs, api_key, selected_model,
+                                                              None if hedge_model in ("None", selected_model) else hedge_model)
+
+    recruiter_job = show_job("recruiter_job", "Resume", top_n)
 
 # === Quick Access Mode ===
 with tab3:
     st.header("Quick Access Mode")
-    api_key = st.text_input("🔑 API Key", type="password", key="quick_api")
+    api_key = st.text_input("🔑 API Key(s), comma-separated", type="password", key="quick_api")
     selected_model = st.selectbox("Select Gemini Model", MODEL_OPTIONS, key="quick_model")
     resume_file = st.file_uploader("Upload Resume", type=["pdf", "docx", "txt"])
     jd_file = st.file_uploader("Upload Job Description", type=["pdf", "docx", "txt"])
@@ -165,10 +185,42 @@ with tab3:
 # === Model Accuracy Tab ===
 with tab4:
     st.header("📊 Gemini Model Accuracy")
-    model_names = list(accuracy_map.keys())
-    accuracy_scores = list(accuracy_map.values())
-    df = pd.DataFrame({"Model": model_names, "Accuracy %": accuracy_scores})
-    st.dataframe(df)
-
-    fig = px.bar(df, x="Accuracy %", y="Model", orientation="h", color="Accuracy %", text="Accuracy %")
-    st.plotly_chart(fig, use_container_width=True)
+    # Measured by Model Analyzer's "Evaluate Models" (or `FResAlyzer_CLI.py evaluate`) on a labelled dataset.
+    uploaded = st.file_uploader("📂 Evaluation results (model_evaluation.json)", type=["json"], key="evaluation_upload")
+    evaluation = json.loads(uploaded.getvalue()) if uploaded else load_evaluation()
+    if evaluation is None:
+        st.info("No measurements yet. Run `python FResAlyzer_CLI.py evaluate --dataset labels.csv` "
+                "and upload the model_evaluation.json it writes.")
+    else:
+        min_accuracy = st.slider("Minimum accuracy %", 0, 100, DEFAULT_MIN_ACCURACY)
+        df = pd.DataFrame(evaluation["models"])[["model", "accuracy", "mae", "latency_p50", "latency_p95",
+                                                 "error_rate", "input_tokens", "output_tokens"]]
+        df.columns = ["Model", "Accuracy %", "MAE", "p50 latency (s)", "p95 latency (s)", "Error %",
+                      "Input tokens", "Output tokens"]
+        st.caption(f"{evaluation['items']} labelled pair(s); a score agrees when it is within "
+                   f"{evaluation['tolerance']} points of the label.")
+        st.dataframe(df.sort_values("Accuracy %", ascending=False))
+
+        measured = df.dropna(subset=["p50 latency (s)"])
+        fig = px.scatter(measured, x="p50 latency (s)", y="Accuracy %", text="Model",
+                         size=measured["Error %"] + 5, color="Error %")
+        fig.add_hline(y=min_accuracy, line_dash="dash")
+        st.plotly_chart(fig, use_container_width=True)
+
+        best = pick_model(evaluation, min_accuracy)
+        if best:
+            st.success(f"Fastest model with at least {min_accuracy}% accuracy: {best['model']} "
+                       f"({best['accuracy']}%, median {best['latency_p50']}s)")
+        else:
+            st.warning(f"No measured model reached {min_accuracy}% accuracy.")
+
+# Where this server's time, tokens and quota have gone since it started (all sessions).
+with st.sidebar.expander("📈 Run Statistics"):
+    st.text("\n".join(metrics.summary()))
+    st.download_button("📥 Metrics (JSON)", metrics.to_json(), file_name="fresalyzer_metrics.json")
+    st.download_button("📥 Metrics (Prometheus)", metrics.to_prometheus(), file_name="fresalyzer_metrics.prom")
+
+# Keep refreshing while a background analysis from this page is still running.
+if is_active(candidate_job) or is_active(recruiter_job):
+    time.sleep(POLL_SECONDS)
+    st.rerun()
@@ -0,0 +1,159 @@
+# === jobs.py ===
+%%writefile jobs.py
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from Disk_Cache import CACHE_DIR
+
+# Analyses run here instead of inside the Streamlit script, so a session only submits and polls.
+# At most MAX_JOB_WORKERS jobs run at once across all sessions; the rest wait in the queue.
+# The queue itself is this process's thread pool: a job's arguments include API keys, which are never written
+# to disk, so SQLite only holds status and results and a queued job does not survive a restart.
+MAX_JOB_WORKERS = 4
+JOB_TTL = 24 * 3600
+
+# Which server process a job belongs to, so several Streamlit processes can share one database.
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+def _process_alive(pid):
+    # Signal 0 only checks that the process exists (POSIX, where the web app runs).
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _orphaned(owner):
+    # Jobs from before owners were recorded, or from a process on this machine that is gone.
+    if not owner:
+        return True
+    host, _, pid = owner.rpartition(":")
+    return host == socket.gethostname() and owner != OWNER and pid.isdigit() and not _process_alive(int(pid))
+
+class JobStore:
+    # Job status and partial results live in SQLite, so a refreshed browser (or another tab) can read them by id.
+    def __init__(self, path=os.path.join(CACHE_DIR, "jobs.sqlite3")):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, total INTEGER NOT NULL, "
+            "error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "job_id TEXT NOT NULL, seq INTEGER NOT NULL, row TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        # Each worker pool lives in its own process, so unfinished jobs of a process that has exited can never
+        # complete; jobs of other live processes are left alone.
+        owners = self._conn.execute(
+            "SELECT DISTINCT owner FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall()
+        for (owner,) in owners:
+            if _orphaned(owner):
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Interrupted by a server restart.' "
+                    "WHERE status IN ('queued', 'running') AND owner IS ?",
+                    (owner,),
+                )
+        self._conn.commit()
+
+    def create(self, kind, total):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, total, owner, created, updated) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, total, OWNER, now, now),
+            )
+            self._conn.commit()
+        return job_id
+
+    def set_status(self, job_id, status, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def add_result(self, job_id, row):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO results (job_id, seq, row) "
+                "SELECT ?, COALESCE(MAX(seq), 0) + 1, ? FROM results WHERE job_id = ?",
+                (job_id, json.dumps(row), job_id),
+            )
+            self._conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT kind, status, total, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT row FROM results WHERE job_id = ? ORDER BY seq", (job_id,)
+            ).fetchall()
+        kind, status, total, error = job
+        return {"id": job_id, "kind": kind, "status": status, "total": total, "error": error,
+                "results": [json.loads(row) for (row,) in rows]}
+
+    def _purge(self, now):
+        expired = "FROM jobs WHERE updated < ? AND status IN ('done', 'failed')"
+        self._conn.execute(f"DELETE FROM results WHERE job_id IN (SELECT id {expired})", (now - JOB_TTL,))
+        self._conn.execute(f"DELETE {expired}", (now - JOB_TTL,))
+
+_store = None
+_pool = None
+_init_lock = threading.Lock()
+
+def _runtime():
+    # One store and one pool per server process, shared by every session and kept across reruns.
+    global _store, _pool
+    with _init_lock:
+        if _store is None:
+            _store = JobStore()
+            _pool = ThreadPoolExecutor(max_workers=MAX_JOB_WORKERS, thread_name_prefix="job")
+    return _store, _pool
+
+def _run(store, job_id, fn, args):
+    store.set_status(job_id, "running")
+    try:
+        fn(*args, lambda row: store.add_result(job_id, row))
+    except Exception as e:
+        store.set_status(job_id, "failed", str(e))
+    else:
+        store.set_status(job_id, "done")
+
+def submit_job(kind, total, fn, *args):
+    # fn(*args, emit) runs on the shared pool; every emit(row) is visible to get_job straight away.
+    # Arguments (including the API key) stay in memory and are never written to the database.
+    store, pool = _runtime()
+    job_id = store.create(kind, total)
+    pool.submit(_run, store, job_id, fn, args)
+    return job_id
+
+def get_job(job_id):
+    store, _ = _runtime()
+    return store.get(job_id)
+
+def is_active(job):
+    return job is not None and job["status"] in ("queued", "running")